@@ -0,0 +1,976 @@
+"""
+Benchmarks for krpg. Run with `python tools.py bench --help`.
+"""
+
+from __future__ import annotations
+
+import gc
+import glob
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import types
+from typing import TYPE_CHECKING, Any, Callable, Sequence
+
+import generator
+
+from krpg.bestiary import BESTIARY, Bestiary
+from krpg.engine import builder
+from krpg.engine.executer import Executer, Namespace, compile_code, generate_named_script, parse_condition
+from krpg.engine.expressions import compile_expression
+from krpg.engine.linker import Linker, link
+from krpg.engine.npc import Npc
+from krpg.engine.quests import Quest, QuestManager, Stage
+from krpg.engine.variables import VariableStore
+from krpg.engine.world import Location
+from krpg.entity.inventory import Item
+from krpg.parser import Section, TokenType, freeze, parse, tokenize
+from krpg.utils import Nameable, add, get_by_id
+
+if TYPE_CHECKING:
+    from krpg.game import Game
+
+type Result = dict[str, Any]
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def timeit(func: Callable[[], Any], repeat: int = 1) -> float:
+    """Measure best time of function call
+
+    Parameters
+    ----------
+    func : Callable[[], Any]
+        Function to measure
+    repeat : int, optional
+        Number of runs, by default 1
+
+    Returns
+    -------
+    float
+        Best time in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def make_entities(count: int) -> list[Nameable]:
+    """Create entities of mixed types
+
+    Parameters
+    ----------
+    count : int
+        Number of entities
+
+    Returns
+    -------
+    list[Nameable]
+        Items, npcs and locations in round-robin order
+    """
+    types: list[type[Nameable]] = [Item, Npc, Location]
+    return [types[i % len(types)](id=f"entity_{i}", name=f"Entity {i}") for i in range(count)]
+
+
+def bench_bestiary(sizes: list[int], ops: int = 1000) -> Result:
+    """Compare indexed Bestiary with the linear list scan
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of entities in bestiary
+    ops : int, optional
+        Number of lookups per measurement, by default 1000
+
+    Returns
+    -------
+    Result
+        Time per operation in microseconds for each size
+    """
+    rnd = random.Random(0)
+    results: Result = {}
+    for size in sizes:
+        entities = make_entities(size)
+        extra = [Item(id=f"extra_{i}", name="Extra") for i in range(ops)]
+        ids = [rnd.choice(entities).id for _ in range(ops)]
+
+        bestiary = Bestiary()
+
+        def fill(items: Sequence[Nameable]) -> None:
+            for e in items:
+                bestiary.add(e)
+
+        build_time = timeit(lambda: fill(entities))
+        linear = list(entities)
+
+        def linear_add() -> None:
+            for e in extra:
+                add(linear, e)
+            del linear[size:]
+
+        results[str(size)] = {
+            "build_ms": build_time * 1e3,
+            "add_us": {
+                "linear": timeit(linear_add) / ops * 1e6,
+                "indexed": timeit(lambda: fill(extra)) / ops * 1e6,
+            },
+            "lookup_us": {
+                "linear": timeit(lambda: [get_by_id(linear, i) for i in ids], 3) / ops * 1e6,
+                "indexed": timeit(lambda: [bestiary.get_entity_by_id(i, Nameable) for i in ids], 3) / ops * 1e6,
+            },
+            "get_all_us": {
+                "linear": timeit(lambda: [obj for obj in linear if isinstance(obj, Npc)], 3) * 1e6,
+                "indexed": timeit(lambda: bestiary.get_all(Npc), 3) * 1e6,
+            },
+        }
+    return results
+
+
+def legacy_tokenize(text: str) -> list[tuple[TokenType, str]]:
+    """Character-by-character tokenizer used before the regex scanner, kept as a baseline"""
+    text = text.strip()
+    tokens: list[tuple[TokenType, str]] = []
+    temp = ""
+    is_string = False
+    is_comment = False
+    close_char = None
+
+    def add_temp(t: TokenType = TokenType.COMMAND) -> None:
+        nonlocal temp
+        if temp or is_string:
+            tokens.append((t, temp.strip()))
+            temp = ""
+
+    for char in text:
+        if is_string:
+            if char == close_char:
+                add_temp()
+                is_string = False
+            else:
+                temp += char
+            continue
+        if is_comment:
+            if char == "\n":
+                is_comment = False
+            else:
+                continue
+        if char in "{}":
+            add_temp()
+            tokens.append((TokenType.BRACE, char))
+        elif char in "\"'`":
+            is_string = True
+            close_char = char
+        elif char == "#":
+            is_comment = True
+        elif char == "\n":
+            add_temp()
+            tokens.append((TokenType.NEWLINE, "\n"))
+        elif char != " ":
+            temp += char
+        else:
+            add_temp()
+    add_temp()
+    tokens.append((TokenType.NEWLINE, "\n"))
+    return tokens
+
+
+def synthetic_content(count: int) -> str:
+    """Generate content text with items and dialogue scenarios
+
+    Parameters
+    ----------
+    count : int
+        Number of items and scenarios
+
+    Returns
+    -------
+    str
+        Content in krpg format
+    """
+    items = [f'    item_{i} "Предмет {i}" "Описание предмета {i}" {{\n        stack {i % 10 + 1}\n    }}\n' for i in range(count)]
+    scenarios = [
+        f"    scenario_{i} {{\n"
+        f"        # Сценарий {i}\n"
+        f'        say "Первая реплика сценария {i}, довольно длинная, как и большинство наших диалогов."\n'
+        f'        if "_random > {i % 100}" {{\n'
+        f"            pickup item_{i}\n"
+        f"        }}\n"
+        f"    }}\n"
+        for i in range(count)
+    ]
+    return "items {\n" + "".join(items) + "}\n\nscenarios {\n" + "".join(scenarios) + "}\n"
+
+
+def bench_tokenizer(sizes: list[int]) -> Result:
+    """Compare throughput of the regex tokenizer with the legacy one
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of items and scenarios in synthetic content
+
+    Returns
+    -------
+    Result
+        Throughput in MB/s for each size
+    """
+    results: Result = {}
+    for size in sizes:
+        text = synthetic_content(size)
+        mb = len(text.encode()) / 2**20
+        results[str(size)] = {
+            "size_mb": mb,
+            "tokenize_mb_s": {
+                "legacy": mb / timeit(lambda: legacy_tokenize(text), 3),
+                "regex": mb / timeit(lambda: list(tokenize(text)), 3),
+            },
+            "parse_mb_s": mb / timeit(lambda: parse(tokenize(text)), 3),
+        }
+    return results
+
+
+def retained(func: Callable[[], Any]) -> tuple[Any, float]:
+    """Measure memory retained by the result of function call
+
+    Parameters
+    ----------
+    func : Callable[[], Any]
+        Function to measure
+
+    Returns
+    -------
+    tuple[Any, float]
+        Result and retained size in MB
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, size / 2**20
+
+
+def bench_memory(sizes: list[int]) -> Result:
+    """Compare memory held by the parse tree and by its frozen form
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of items and scenarios in synthetic content
+
+    Returns
+    -------
+    Result
+        Retained size in MB for each size
+    """
+    results: Result = {}
+    for size in sizes:
+        text = synthetic_content(size)
+        _, tree_mb = retained(lambda: parse(tokenize(text)))
+        # The tree is dropped after freezing, as after build
+        _, frozen_mb = retained(lambda: freeze(parse(tokenize(text))))
+        results[str(size)] = {
+            "tree_mb": tree_mb,
+            "frozen_mb": frozen_mb,
+            "ratio": tree_mb / frozen_mb,
+        }
+    return results
+
+
+def build_stages(folder: str) -> list[tuple[str, Callable[[], Any]]]:
+    """Stages of loading a content pack and starting a new game
+
+    Stages are run in order, each one uses results of the previous ones.
+    The content is built into the global bestiary, as the game expects.
+    """
+    from krpg.game import Game, GameBase
+
+    files = sorted(glob.glob(os.path.join(folder, "*.krpg")))
+    texts = [open(path, encoding="utf-8").read() for path in files]
+    state: dict[str, Any] = {}
+    base = GameBase()
+    base.console.console.file = io.StringIO()
+
+    def parse_pack() -> None:
+        state["root"], _ = builder.parse_pack(folder)
+
+    def step(name: str, func: Callable[..., None]) -> Callable[[], None]:
+        def run() -> None:
+            section = state["root"].get(name, command=False)
+            if section:
+                func(BESTIARY, base.console, section)
+
+        return run
+
+    def init() -> None:
+        BESTIARY.add(generate_named_script(state["root"].get("init", command=False)))
+        link(BESTIARY, base.console, state["root"], BESTIARY.data)
+
+    stages: list[tuple[str, Callable[[], Any]]] = [
+        ("tokenize", lambda: [list(tokenize(text)) for text in texts]),
+        ("parse", lambda: [parse(tokenize(text)) for text in texts]),
+        ("parse_pack", parse_pack),
+        ("clear", BESTIARY.clear),
+    ]
+    stages += [(func.__name__, step(name, func)) for name, func in builder.STEPS]
+    stages += [("link", init), ("new_game", lambda: Game(base))]
+    return stages
+
+
+def bench_build(sizes: list[int], seed: int = 0) -> Result:
+    """Measure time and peak memory of build stages on generated content
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of entities in generated content
+    seed : int, optional
+        Content generator seed, by default 0
+
+    Returns
+    -------
+    Result
+        Time in ms and peak memory in MB of each stage for each size
+    """
+    results: Result = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            generator.write_world(folder, size, seed)
+            result: Result = {"size_mb": sum(os.path.getsize(p) for p in glob.glob(f"{folder}/*.krpg")) / 2**20}
+            for name, stage in build_stages(folder):
+                result[name] = {"time_ms": timeit(stage) * 1e3}
+            # Tracing slows everything down, so memory is measured in a separate run
+            tracemalloc.start()
+            for name, stage in build_stages(folder):
+                tracemalloc.reset_peak()
+                stage()
+                result[name]["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+            BESTIARY.clear()
+        del result["clear"]
+        results[str(size)] = result
+    return results
+
+
+def generated_game(entities: int = 10) -> Game:
+    """Game on a generated content pack with the console output hidden
+
+    Parameters
+    ----------
+    entities : int, optional
+        Number of generated entities, by default 10
+
+    Returns
+    -------
+    Game
+        New game
+    """
+    from krpg.game import Game, GameBase
+
+    base = GameBase(Bestiary())
+    base.console.console.file = io.StringIO()
+    with tempfile.TemporaryDirectory() as folder:
+        generator.write_world(folder, entities)
+        builder.build(base.bestiary, base.console, folder)
+    return Game(base)
+
+
+def bench_script(sizes: list[int]) -> Result:
+    """Measure dispatch cost of script lines
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of lines in script
+
+    Returns
+    -------
+    Result
+        Time per line in microseconds for each size
+    """
+    game = generated_game()
+    game.executer.env["flag"] = True
+    results: Result = {}
+    for size in sizes:
+        section = parse(tokenize("bench {\n" + "require value flag\n" * size + "}\n")).children[0]
+        assert isinstance(section, Section)
+        script = generate_named_script(section)
+        Linker(game.bestiary).link_script(script)
+        results[str(size)] = {
+            "line_us": timeit(lambda: script.script.run(game.executer), 3) / size * 1e6,
+        }
+    return results
+
+
+def bench_dialogue(sizes: list[int]) -> Result:
+    """Measure display latency of say lines, pre-rendered and as a markup string
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of lines in dialogue
+
+    Returns
+    -------
+    Result
+        Time per line in microseconds for each kind of line
+    """
+    game = generated_game()
+    game.executer.env["_random"] = 42
+    rnd = random.Random(0)
+    kinds = {
+        "static": lambda: f'say "{generator.phrase(rnd, 12)}"',
+        "speaker": lambda: f'say npc_0 "{generator.phrase(rnd, 12)}"',
+        "template": lambda: f'say "{generator.phrase(rnd, 6)} {{_random}} {generator.phrase(rnd, 6)}"',
+    }
+    results: Result = {}
+    for size in sizes:
+        result: Result = {}
+        for kind, line in kinds.items():
+            section = parse(tokenize("bench {\n" + "".join(line() + "\n" for _ in range(size)) + "}\n")).children[0]
+            assert isinstance(section, Section)
+            script = generate_named_script(section)
+            texts = [" ".join(node.args[-1:]) for node in script.script.node.children or ()]
+            Linker(game.bestiary).link_script(script)
+
+            def legacy() -> None:
+                for text in texts:
+                    game.console.print("[green]" + game.executer.process_text(text))
+
+            result[kind] = {
+                "legacy_us": timeit(legacy, 3) / size * 1e6,
+                "compiled_us": timeit(lambda: script.script.run(game.executer), 3) / size * 1e6,
+            }
+        results[str(size)] = result
+    return results
+
+
+def parse_sites() -> list[tuple[str, int, int]]:
+    """Source ranges that create parse objects: the parser and script compilation"""
+    import inspect
+
+    from krpg import parser
+    from krpg.engine import executer
+
+    sites = [(os.path.abspath(inspect.getfile(parser)), 0, 10**9)]
+    funcs: list[Callable[..., Any]] = [executer.compile_block, executer.Script.compile, executer.generate_named_script, executer.parse_condition]
+    for func in funcs:
+        lines, first = inspect.getsourcelines(func)
+        sites.append((os.path.abspath(inspect.getfile(func)), first, first + len(lines)))
+    return sites
+
+
+def nested_scenario(depth: int) -> str:
+    """Scenario with `if` and `require` blocks nested `depth` times
+
+    Parameters
+    ----------
+    depth : int
+        Nesting depth of conditionals
+
+    Returns
+    -------
+    str
+        Source of the `bench` scenario
+    """
+    body = 'set _x "_x + 1"\n'
+    for i in range(depth):
+        kind = f'if "_x > {-i}"' if i % 2 else "require value missing"
+        body = f'{kind} {{\n{body}set _y "_x * 2"\n}}\n' if i % 2 else f'set _x "0"\n{kind} {{\n{body}}}\n'
+    return f"bench {{\n{body}}}\n"
+
+
+def parse_allocations(run: Callable[[], Any], runs: int) -> tuple[int, float]:
+    """Count memory blocks the parser and script compilation allocate during runs
+
+    Parameters
+    ----------
+    run : Callable[[], Any]
+        Function to run
+    runs : int
+        Number of runs
+
+    Returns
+    -------
+    tuple[int, float]
+        Parse objects still allocated after the runs and net allocated KB
+    """
+    sites = parse_sites()
+
+    def from_sites(stat: tracemalloc.StatisticDiff) -> bool:
+        return any(path == frame.filename and first <= frame.lineno <= last for frame in stat.traceback for path, first, last in sites)
+
+    gc.collect()
+    tracemalloc.start(25)
+    try:
+        before = tracemalloc.take_snapshot()
+        for _ in range(runs):
+            run()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = [stat for stat in after.compare_to(before, "traceback") if stat.count_diff > 0]
+    return sum(stat.count_diff for stat in stats if from_sites(stat)), sum(stat.size_diff for stat in stats) / 2**10
+
+
+def bench_allocations(sizes: list[int], depth: int = 5) -> Result:
+    """Check that running a compiled scenario allocates no parse objects
+
+    The scenario has nested `if` and `require` blocks. It is run once to
+    compile it, then memory blocks allocated by the parser and by script
+    compilation during the next runs are counted with tracemalloc. The
+    check fails if there are any.
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of runs
+    depth : int, optional
+        Nesting depth of conditionals, by default 5
+
+    Returns
+    -------
+    Result
+        Allocated parse objects and net allocated KB for each number of runs
+    """
+    game = generated_game()
+    section = parse(tokenize(nested_scenario(depth))).children[0]
+    assert isinstance(section, Section)
+    script = generate_named_script(section)
+    Linker(game.bestiary).link_script(script)
+    script.script.run(game.executer)
+
+    results: Result = {}
+    for size in sizes:
+        parse_objects, net_kb = parse_allocations(lambda: script.script.run(game.executer), size)
+        assert parse_objects == 0, f"{parse_objects} parse objects allocated in {size} runs"
+        results[str(size)] = {"parse_objects": parse_objects, "net_kb": net_kb}
+    return results
+
+
+def bench_eval(sizes: list[int], calls: int = 10_000) -> Result:
+    """Compare per-call latency of scenario code with the copying evaluator
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of variables in env
+    calls : int, optional
+        Number of calls per measurement, by default 10000
+
+    Returns
+    -------
+    Result
+        Time per call in microseconds for each size
+    """
+    game = object()
+    cases = {"evaluate": ("_random > 60", "eval"), "process_text": ("f'''Осталось {_random} минут'''", "eval"), "exec": ("env['_x'] = _random", "exec")}
+    results: Result = {}
+    for size in sizes:
+        env: dict[str, Any] = {f"var_{i}": i for i in range(size)}
+        env["_random"] = 61
+        result: Result = {}
+        for name, (text, mode) in cases.items():
+            func = eval if mode == "eval" else exec
+
+            def legacy() -> None:
+                for _ in range(calls):
+                    func(text, env | {"game": game, "env": env})
+
+            def cached() -> None:
+                for _ in range(calls):
+                    func(compile_code(text, mode), Namespace(game, env))  # type: ignore[arg-type]
+
+            result[name] = {"legacy": timeit(legacy) / calls * 1e6, "cached": timeit(cached, 3) / calls * 1e6}
+        results[str(size)] = result
+    return results
+
+
+def bench_expressions(sizes: list[int], calls: int = 10_000) -> Result:
+    """Compare per-call latency of compiled expressions with cached eval
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of variables in env
+    calls : int, optional
+        Number of calls per measurement, by default 10000
+
+    Returns
+    -------
+    Result
+        Time per call in microseconds and variables read by each expression
+    """
+    game = types.SimpleNamespace(random=random.Random(0))
+    cases = {
+        "compare": "_random > 60",
+        "contains": "1 in quest_selects",
+        "random": "game.random.randint(0, 100)",
+        "logic": "_random > 30 and _random <= 60 or not quest_selects",
+    }
+    results: Result = {}
+    for size in sizes:
+        env: dict[str, Any] = {f"var_{i}": i for i in range(size)}
+        env |= {"_random": 61, "quest_selects": [1, 3]}
+        result: Result = {}
+        for name, text in cases.items():
+            expression = compile_expression(text)
+
+            def cached() -> None:
+                for _ in range(calls):
+                    eval(compile_code(text, "eval"), Namespace(game, env))  # type: ignore[arg-type]
+
+            def compiled() -> None:
+                for _ in range(calls):
+                    expression(game, env)  # type: ignore[arg-type]
+
+            result[name] = {
+                "eval": timeit(cached, 3) / calls * 1e6,
+                "compiled": timeit(compiled, 3) / calls * 1e6,
+                "reads": sorted(expression.names | expression.attributes),
+            }
+        results[str(size)] = result
+    return results
+
+
+def bench_predicates(sizes: list[int], calls: int = 10_000) -> Result:
+    """Compare memoized quest predicates with evaluation from scratch
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of started quests
+    calls : int, optional
+        Number of checks per measurement, by default 10000
+
+    Returns
+    -------
+    Result
+        Time per check in microseconds for each size
+    """
+    results: Result = {}
+    for size in sizes:
+        manager = QuestManager()
+        for i in range(size):
+            manager.start(Quest(id=f"quest_{i}", name=f"Quest {i}", stages=[Stage("stage")]))
+        game = types.SimpleNamespace(quest_manager=manager)
+        executer = Executer(game)  # type: ignore[arg-type]
+        condition = parse_condition("quest", f"quest_{size - 1}", "started")
+        condition.args = (manager.quests[-1].quest, *condition.args[1:])
+        results[str(size)] = {
+            "eval_us": timeit(lambda: [condition.eval(game) for _ in range(calls)]) / calls * 1e6,  # type: ignore[arg-type]
+            "memoized_us": timeit(lambda: [executer.check(condition) for _ in range(calls)]) / calls * 1e6,
+        }
+    return results
+
+
+def bench_variables(sizes: list[int], writes: int = 10) -> Result:
+    """Compare a full save of executer variables with a delta save
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of variables
+    writes : int, optional
+        Number of variables changed between saves, by default 10
+
+    Returns
+    -------
+    Result
+        Packed size in KB and time in microseconds for each size
+    """
+    import msgpack  # type: ignore
+
+    results: Result = {}
+    for size in sizes:
+        store = VariableStore({f"var_{i}": f"value {i}" for i in range(size)})
+
+        def change() -> None:
+            for i in range(writes):
+                store[f"var_{i * size // writes}"] = i
+                store[f"_temp_{i}"] = i
+
+        def full() -> bytes:
+            change()
+            store.clear_temporary()
+            store.checkpoint()
+            return msgpack.dumps(store)  # type: ignore
+
+        def delta() -> bytes:
+            change()
+            store.clear_temporary()
+            data = store.delta()
+            store.checkpoint()
+            return msgpack.dumps(data)  # type: ignore
+
+        results[str(size)] = {
+            "full": {"kb": len(full()) / 2**10, "us": timeit(full, 3) * 1e6},
+            "delta": {"kb": len(delta()) / 2**10, "us": timeit(delta, 3) * 1e6},
+        }
+    return results
+
+
+def bench_events(sizes: list[int], events: int = 10_000) -> Result:
+    """Compare publishing with the dispatch table and with the legacy lookup
+
+    The legacy handler looks up listeners of the exact type and of Event,
+    and checks the HasGame protocol with isinstance on every event.
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of event types with a listener each
+    events : int, optional
+        Number of published events, by default 10000
+
+    Returns
+    -------
+    Result
+        Time per publish in microseconds for each size
+    """
+    from krpg.events import Event, EventHandler, Listener
+    from krpg.events_middleware import GameEvent, GameMiddleware, HasGame
+
+    class LegacyMiddleware(GameMiddleware):
+        def process(self, event: Event) -> None:
+            if isinstance(event, HasGame):
+                event.game = self.game
+
+    class LegacyHandler(EventHandler):
+        def publish(self, event: Event) -> None:
+            for mw in self.middlewares:
+                mw.process(event)
+            for listener in self.listeners[type(event)]:
+                listener.callback(event)  # type: ignore[arg-type]
+            for listener in self.listeners[Event]:
+                listener.callback(event)  # type: ignore[arg-type]
+
+    results: Result = {}
+    for size in sizes:
+        event_types = [type(f"Event{i}", (GameEvent,), {}) for i in range(size)]
+        rnd = random.Random(0)
+        stream = [rnd.choice(event_types)() for _ in range(events)]
+        result: Result = {}
+        for name, handler, middleware in [("legacy", LegacyHandler(), LegacyMiddleware), ("dispatch", EventHandler(), GameMiddleware)]:
+            handler.middlewares.append(middleware(None))  # type: ignore[arg-type]
+            for event_type in event_types:
+                handler.subscribe(Listener(event_type, lambda e: None))
+            handler.subscribe(Listener(Event, lambda e: None))
+
+            def publish() -> None:
+                for event in stream:
+                    handler.publish(event)
+
+            result[name] = timeit(publish, 3) / events * 1e6
+        results[str(size)] = result
+    return results
+
+
+def bench_batching(sizes: list[int], waits: int = 100) -> Result:
+    """Compare quest checks after waits in a loop, published one by one and in a batch
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of started quests, each with a pickup objective
+    waits : int, optional
+        Number of wait commands, by default 100
+
+    Returns
+    -------
+    Result
+        Time of the loop in milliseconds for each size
+    """
+    from krpg.commands import CommandManager
+    from krpg.engine.clock import Clock, wait
+    from krpg.engine.quests import PickupObjective
+    from krpg.engine.quests import test as check_quests
+    from krpg.events import EventHandler, Listener
+    from krpg.events_middleware import GameMiddleware
+
+    results: Result = {}
+    for size in sizes:
+        manager = QuestManager()
+        for i in range(size):
+            manager.start(Quest(id=f"quest_{i}", name=f"Quest {i}", stages=[Stage("stage", [PickupObjective("Подобрать", "item", 10**9)])]))
+        game = types.SimpleNamespace(quest_manager=manager, clock=Clock())
+        handler = EventHandler()
+        assert isinstance(check_quests, Listener)
+        handler.subscribe(check_quests)
+        handler.middlewares.append(GameMiddleware(game))  # type: ignore[arg-type]
+        commands = CommandManager(handler)
+
+        def unbatched() -> None:
+            for _ in range(waits):
+                commands.execute(wait(game.clock, 1))
+
+        def batched() -> None:
+            with commands.batch():
+                unbatched()
+
+        results[str(size)] = {"unbatched_ms": timeit(unbatched) * 1e3, "batched_ms": timeit(batched) * 1e3}
+    return results
+
+
+def bench_journal(sizes: list[int]) -> Result:
+    """Compare a full save after every command with a journal append, and measure replay
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of journaled wait commands
+
+    Returns
+    -------
+    Result
+        Time per command in microseconds and replay time in milliseconds for each size
+    """
+    from krpg.encoder import create_save
+    from krpg.engine.clock import wait
+    from krpg.engine.journal import Journal, replay
+    from krpg.game import Game, GameBase
+
+    base = GameBase()
+    base.console.console.file = io.StringIO()
+    base.load_bestiary(False)
+    results: Result = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "game.journal")
+            game = Game(base, seed=0)
+            journal = game.commands.journal = Journal.create(game, path)
+            journal.start()
+
+            def commands() -> None:
+                for _ in range(size):
+                    game.commands.execute(wait(game.clock, 1))
+
+            result: Result = {
+                "save_us": timeit(lambda: create_save(game.serialize()), 3) * 1e6,
+                "append_us": timeit(commands) / size * 1e6,
+                "journal_kb": os.path.getsize(path) / 2**10,
+            }
+            journal.close()
+
+            def replayed() -> None:
+                replay(base, path).commands.journal.close()  # type: ignore[union-attr]
+
+            result["replay_ms"] = timeit(replayed) * 1e3
+            results[str(size)] = result
+    return results
+
+
+def bench_bus(sizes: list[int], events: int = 200) -> Result:
+    """Compare the latency of publish with a slow listener called inline, deferred and in background
+
+    The slow listener sleeps like a consumer writing to a file or to the
+    network. The total time includes the end of the turn and waiting for
+    the background queue to drain.
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Time the slow listener takes in microseconds
+    events : int, optional
+        Number of published events, by default 200
+
+    Returns
+    -------
+    Result
+        Time per publish and total time per event in microseconds for each size
+    """
+    from krpg.events import Delivery, Event, EventHandler, Listener
+    from krpg.events_bus import EventBus
+
+    results: Result = {}
+    for size in sizes:
+
+        def slow(event: Event) -> None:
+            time.sleep(size / 1e6)
+
+        result: Result = {}
+        for delivery in Delivery:
+            handler = EventHandler()
+            handler.bus = EventBus(queue_size=events)
+            handler.subscribe(Listener(Event, lambda e: None))
+            handler.subscribe(Listener(Event, slow, delivery=delivery))
+            publish_time = 0.0
+            start = time.perf_counter()
+            for _ in range(events):
+                begin = time.perf_counter()
+                handler.publish(Event())
+                publish_time += time.perf_counter() - begin
+            handler.end_turn()
+            handler.bus.flush()
+            total = time.perf_counter() - start
+            handler.close()
+            result[delivery.value] = {"publish_us": publish_time / events * 1e6, "total_us": total / events * 1e6}
+        results[str(size)] = result
+    return results
+
+
+def bench_metrics(sizes: list[int], events: int = 10_000) -> Result:
+    """Compare publishing with and without event metrics
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Number of listeners of every event
+    events : int, optional
+        Number of published events, by default 10000
+
+    Returns
+    -------
+    Result
+        Time per publish in microseconds for each size
+    """
+    from krpg.events import Event, EventHandler, Listener
+    from krpg.events_metrics import EventMetrics
+    from krpg.events_middleware import GameEvent, GameMiddleware
+
+    results: Result = {}
+    for size in sizes:
+        result: Result = {}
+        for name, metrics in [("off", None), ("on", EventMetrics())]:
+            handler = EventHandler()
+            handler.middlewares.append(GameMiddleware(None))  # type: ignore[arg-type]
+            for _ in range(size):
+                handler.subscribe(Listener(Event, lambda e: None))
+            handler.set_metrics(metrics)
+
+            def publish() -> None:
+                for _ in range(events):
+                    handler.publish(GameEvent())
+
+            result[name] = timeit(publish, 3) / events * 1e6
+        results[str(size)] = result
+    return results
+
+
+SUITES: dict[str, Callable[..., Result]] = {
+    "bestiary": bench_bestiary,
+    "tokenizer": bench_tokenizer,
+    "memory": bench_memory,
+    "build": bench_build,
+    "script": bench_script,
+    "allocations": bench_allocations,
+    "dialogue": bench_dialogue,
+    "eval": bench_eval,
+    "expressions": bench_expressions,
+    "predicates": bench_predicates,
+    "variables": bench_variables,
+    "events": bench_events,
+    "batching": bench_batching,
+    "journal": bench_journal,
+    "bus": bench_bus,
+    "metrics": bench_metrics,
+}
@@ -0,0 +1,166 @@
+"""
+Synthetic content generator. Run with `python tools.py generate --help`.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+
+# Share of each entity type in generated world
+SHARES = {
+    "items": 0.3,
+    "locations": 0.2,
+    "npcs": 0.2,
+    "quests": 0.2,
+    "scenarios": 0.1,
+}
+
+WORDS = "старый тихий дальний северный южный лесной каменный речной забытый светлый темный торговый".split()
+
+
+def phrase(rnd: random.Random, words: int = 8) -> str:
+    return " ".join(rnd.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def block(header: str, lines: list[str]) -> list[str]:
+    return [f"{header} {{", *(f"    {line}" for line in lines), "}"]
+
+
+def counts(entities: int) -> dict[str, int]:
+    return {name: max(1, int(entities * share)) for name, share in SHARES.items()}
+
+
+def generate_world(entities: int, seed: int = 0) -> dict[str, str]:
+    """Generate a content pack
+
+    Each npc gives its quest in the first dialogue stage, takes it back in
+    the second one and says goodbye in the last one. Quest stages ask to
+    pick up items, visit locations and talk to npcs. Locations form a
+    connected graph starting from `loc_0`.
+
+    Parameters
+    ----------
+    entities : int
+        Approximate number of entities
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    dict[str, str]
+        File name to content in krpg format
+    """
+    rnd = random.Random(seed)
+    n = counts(entities)
+    items = [f"item_{i}" for i in range(n["items"])]
+    locations = [f"loc_{i}" for i in range(n["locations"])]
+    npcs = [f"npc_{i}" for i in range(n["npcs"])]
+    quests = [f"quest_{i}" for i in range(n["quests"])]
+    scenarios = [f"scenario_{i}" for i in range(n["scenarios"])]
+
+    lines: list[str] = []
+    for scenario in scenarios:
+        lines += block(scenario, [f'say "{phrase(rnd, 12)}"' for _ in range(rnd.randint(1, 4))])
+    scenarios_text = "\n".join(block("scenarios", lines))
+
+    lines = []
+    for i, item in enumerate(items):
+        props = ["slot_type " + rnd.choice(["WEAPON", "ARMOR", "TROUSERS"])] if i % 5 == 0 else [f"stack {rnd.randint(1, 20)}"]
+        lines += block(f'{item} "Предмет {i}" "{phrase(rnd)}"', props)
+    items_text = "\n".join(block("items", lines))
+
+    lines = []
+    for i, npc in enumerate(npcs):
+        quest = quests[i % len(quests)]
+        first = [f'say {npc} "{phrase(rnd, 12)}"', f'say you "{phrase(rnd, 6)}"', f"quest {quest}", f"evolve {npc}"]
+        second = [
+            *block(f"require quest {quest} stage 1", [f'say "{phrase(rnd)}"']),
+            f'say {npc} "{phrase(rnd, 10)}"',
+            f"complete {quest}",
+            f"evolve {npc}",
+        ]
+        last = [f'say {npc} "{phrase(rnd, 10)}"']
+        if rnd.random() < 0.3:
+            last.append(f"goto {npc} {rnd.choice(locations)}")
+        stages: list[str] = []
+        for actions in [first, second, last]:
+            stages += block("stage", block('action talk "Поговорить"', actions))
+        lines += block(f'{npc} "Персонаж {i}" "{phrase(rnd)}"', stages)
+    npcs_text = "\n".join(block("npcs", lines))
+
+    placed: dict[str, list[str]] = {location: [] for location in locations}
+    for npc in npcs:
+        placed[rnd.choice(locations)].append(npc)
+    lines = []
+    for i, location in enumerate(locations):
+        props = [f"item {rnd.choice(items)} {rnd.randint(1, 5)}" for _ in range(rnd.randint(0, 3))]
+        props += [f"npc {npc}" for npc in placed[location]]
+        if i % 3 == 0:
+            item = rnd.choice(items)
+            explore = [
+                'set _random "game.random.randint(0, 100)"',
+                *block('if "_random > 50"', [f'say "{phrase(rnd)}"', f"pickup {item}"]),
+                "pass 10",
+            ]
+            props += block("stage", block('action explore "Исследовать"', explore))
+        lines += block(f'{location} "Локация {i}" "{phrase(rnd)}"', props)
+    lines.append(f"start {locations[0]}")
+    for i in range(1, len(locations)):
+        lines.append(f"link {locations[rnd.randrange(i)]} {locations[i]}")
+    for _ in range(len(locations) // 4):
+        a, b = rnd.sample(locations, 2) if len(locations) > 1 else (locations[0], locations[0])
+        if a != b:
+            lines.append(f"link {a} {b}")
+    lines += [f"lock {location}" for location in locations[1:] if rnd.random() < 0.1]
+    locations_text = "\n".join(block("locations", lines))
+
+    lines = []
+    for i, quest in enumerate(quests):
+        search = [
+            f'goal PICKUP {rnd.choice(items)} {rnd.randint(1, 5)} "{phrase(rnd, 4)}"',
+            f'goal VISIT {rnd.choice(locations)} "{phrase(rnd, 4)}"',
+            f'goal TALK {rnd.choice(npcs)} "{phrase(rnd, 4)}"',
+            f"end INTRODUCE {rnd.choice(npcs)}",
+            f"end RUN {rnd.choice(scenarios)}",
+        ]
+        finish = [f'goal FREEZE "{phrase(rnd, 4)}"', f"end UNLOCK {rnd.choice(locations)}"]
+        stages = block('"Поиск"', search) + block('"Сдача"', finish)
+        lines += block(f'{quest} "Задание {i}" "{phrase(rnd)}"', stages)
+    quests_text = "\n".join(block("quests", lines))
+
+    init = "\n".join(block("init", [f'say "{phrase(rnd, 12)}"', f"quest {quests[0]}", "pass 1"]))
+    return {
+        "main.krpg": f"{init}\n\n{scenarios_text}\n",
+        "items.krpg": f"{items_text}\n",
+        "npcs.krpg": f"{npcs_text}\n",
+        "locations.krpg": f"{locations_text}\n",
+        "quests.krpg": f"{quests_text}\n",
+    }
+
+
+def write_world(folder: str, entities: int, seed: int = 0) -> list[str]:
+    """Generate a content pack and write it to folder
+
+    Parameters
+    ----------
+    folder : str
+        Pack folder, created if missing
+    entities : int
+        Approximate number of entities
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    list[str]
+        Written files
+    """
+    os.makedirs(folder, exist_ok=True)
+    paths: list[str] = []
+    for name, text in generate_world(entities, seed).items():
+        path = os.path.join(folder, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        paths.append(path)
+    return paths
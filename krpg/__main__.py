@@ -8,7 +8,8 @@ from krpg.game import main
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(prog="KRPG", description="Консольная рпг игра", epilog="Ы :)")
     parser.add_argument("-d", "--debug", action="store_true")  # option that takes a value
+    parser.add_argument("-j", "--journal", help="Журнал команд для восстановления после сбоя")
     parser.add_argument("-v", "--version", action="version", version=__version__)
 
     args = parser.parse_args()
-    main(debug=args.debug)
+    main(debug=args.debug, journal=args.journal)
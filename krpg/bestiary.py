@@ -1,23 +1,50 @@
 from __future__ import annotations
 
-from typing import Any
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
 
 import attr
 from attr import field
 
-from krpg.utils import Nameable, add, get_by_id
+from krpg.utils import Nameable
 
 
 @attr.s(auto_attribs=True)
 class Bestiary:
     data: list[Any] = field(factory=lambda: [])
+    _index: dict[str, Any] = field(factory=lambda: {}, init=False, repr=False)
+    _types: dict[type, list[Any]] = field(factory=lambda: {}, init=False, repr=False)
+
+    def __attrs_post_init__(self) -> None:
+        entities, self.data = self.data, []
+        for entity in entities:
+            self.add(entity)
 
     def add(self, entity: Nameable) -> None:
-        add(self.data, entity)
+        if entity.id in self._index:
+            raise ValueError(f"exists: {entity.id}")
+        self._index[entity.id] = entity
+        self.data.append(entity)
+        # Buckets are created lazily by get_all, keep the existing ones up to date
+        for expected, bucket in self._types.items():
+            if isinstance(entity, expected):
+                bucket.append(entity)
+
+    def remove(self, entity_id: str) -> None:
+        entity = self._index.pop(entity_id)
+        del self.data[next(i for i, item in enumerate(self.data) if item is entity)]
+        # Buckets are rebuilt on the next get_all
+        self._types.clear()
+
+    def clear(self) -> None:
+        self.data.clear()
+        self._index.clear()
+        self._types.clear()
 
     def get_entity_by_id[T](self, entity_id: str, expected: type[T]) -> T | None:
-        obj = get_by_id(self.data, entity_id)
-        if not obj:
+        obj = self._index.get(entity_id)
+        if obj is None:
             return None
 
         assert isinstance(obj, expected)
@@ -30,7 +57,30 @@ class Bestiary:
         return obj
 
     def get_all[T](self, expected: type[T]) -> list[T]:
-        return [obj for obj in self.data if isinstance(obj, expected)]
+        bucket = self._types.get(expected)
+        if bucket is None:
+            bucket = self._types[expected] = [obj for obj in self.data if isinstance(obj, expected)]
+        return bucket.copy()
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._index
 
 
+# Default bestiary of the standalone game
 BESTIARY = Bestiary()
+
+_current: ContextVar[Bestiary] = ContextVar("bestiary")
+
+
+def get_bestiary() -> Bestiary:
+    """Bestiary of the current session, BESTIARY if no session is active"""
+    return _current.get(BESTIARY)
+
+
+@contextmanager
+def use_bestiary(bestiary: Bestiary) -> Iterator[Bestiary]:
+    token = _current.set(bestiary)
+    try:
+        yield bestiary
+    finally:
+        _current.reset(token)
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
-from typing import Any, Callable, Generator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Generator, Iterator
 
 import attr
 from krpg.events import Event, EventHandler
 
+if TYPE_CHECKING:
+    from krpg.engine.journal import Journal
+
 
 type EventGenerator = Generator[Event, Any, Any]
 type Pt = Any
@@ -29,14 +33,62 @@ def command[**P](callback: Callable[P, EventGenerator]) -> Command[P]:
 class CommandManager:
     def __init__(self, event_handler: EventHandler) -> None:
         self.event_handler = event_handler
+        # Events of the open batch scope, None outside of it
+        self.buffer: list[Event] | None = None
+        # Commands executed by other commands are not journaled, replay runs them again
+        self.journal: Journal | None = None
+        self.depth = 0
+
+    @contextmanager
+    def batch(self) -> Iterator[list[Event]]:
+        """Buffer events of executed commands and publish them when the outermost scope exits
+
+        Consecutive events are coalesced with `Event.merge`. Listeners see the
+        state after all commands of the scope, nested scopes join the outer one.
+        """
+        if self.buffer is not None:
+            yield self.buffer
+            return
+        buffer = self.buffer = []
+        try:
+            yield buffer
+        finally:
+            self.buffer = None
+            # Commands run by listeners belong to the batch, like nested commands
+            self.depth += 1
+            try:
+                self.event_handler.publish_batch(buffer)
+            finally:
+                self.depth -= 1
+
+    def push(self, event: Event) -> None:
+        assert self.buffer is not None, "No batch scope"
+        if self.buffer:
+            merged = self.buffer[-1].merge(event)
+            if merged is not None:
+                self.buffer[-1] = merged
+                return
+        self.buffer.append(event)
 
     def execute(self, command: Command[...]) -> Any | None:
+        if self.journal is not None and not self.depth:
+            return self.journal.record(command, self.run)
+        return self.run(command)
+
+    def run(self, command: Command[...]) -> Any | None:
         a, k = command.args, command.kwargs
         gen = command.callback(*a, **k)
-        for event in gen:
-            self.event_handler.publish(event)
+        self.depth += 1
         try:
-            next(gen)
-        except StopIteration as e:
-            return e.value
-        return None
+            for event in gen:
+                if self.buffer is None:
+                    self.event_handler.publish(event)
+                else:
+                    self.push(event)
+            try:
+                next(gen)
+            except StopIteration as e:
+                return e.value
+            return None
+        finally:
+            self.depth -= 1
@@ -46,6 +46,8 @@ class KrpgConsole:
 
         self.queue: list[str] = []
         self.history: list[str] = []
+        # Answers taken while set, in the form the queue accepts them
+        self.tape: list[str] | None = None
 
         self.levels: dict[int, str] = {
             1: "[bold red]> [/]",
@@ -60,6 +62,10 @@ class KrpgConsole:
         self.handler.setLevel(level)
         self.log.setLevel(level)
 
+    def record(self, *items: str) -> None:
+        if self.tape is not None:
+            self.tape.extend(items)
+
     def get_history(self) -> list[str | Any]:
         return [repr(i) if " " in i or not i else i for i in self.history]
 
@@ -130,6 +136,7 @@ class KrpgConsole:
                 if not self.queue:
                     continue
                 item = self.queue.pop(0)
+            self.record(item)
 
             if item == "e":
                 return None
@@ -215,6 +222,7 @@ class KrpgConsole:
             result = self.interactive_multiple(title, filtered_options, min, max)
             if result is None:
                 self.history.append("e")
+                self.record("e")
                 return []
 
             history_entries = []
@@ -224,6 +232,7 @@ class KrpgConsole:
                 history_entries.append(str(index))
             history_entries.append(str(len(filtered_options) + 1))  # confirm index
             self.history.extend(history_entries)
+            self.record(*history_entries)
 
             return result
 
@@ -250,6 +259,7 @@ class KrpgConsole:
             else:
                 history = {v: k for k, v in options.items()}[val]
             self.history.append(history)
+            self.record(history)
             return val
 
     def list_select[T](self, title: str, options: list[T], display: Callable[[Any], str] = str, hide: bool = False) -> T | None:
@@ -0,0 +1,62 @@
+from rich.console import Group
+from rich.table import Table
+
+from krpg.engine.profiler import Profiler, Stat
+from krpg.events_metrics import EventMetrics, Histogram
+
+
+def render_stats(title: str, stats: dict[str, Stat], limit: int) -> Table:
+    table = Table(title=f"[b blue]{title}[/]", title_justify="left")
+    table.add_column("Имя", style="green")
+    table.add_column("Вызовы", justify="right", style="yellow")
+    table.add_column("Всего, мс", justify="right", style="cyan")
+    table.add_column("Собственное, мс", justify="right", style="cyan")
+    top = sorted(stats.items(), key=lambda item: item[1].total, reverse=True)[:limit]
+    for name, stat in top:
+        table.add_row(name, str(stat.calls), f"{stat.total * 1e3:.3f}", f"{stat.own * 1e3:.3f}")
+    return table
+
+
+def render_profile(profiler: Profiler, limit: int = 10) -> Group:
+    return Group(
+        render_stats("Сценарии", profiler.scripts, limit),
+        render_stats("Команды", profiler.commands, limit),
+        render_stats("Строки", profiler.lines, limit),
+    )
+
+
+def render_latency(title: str, stats: dict[str, Histogram], turns: int, limit: int) -> Table:
+    table = Table(title=f"[b blue]{title}[/]", title_justify="left")
+    table.add_column("Имя", style="green", overflow="fold")
+    table.add_column("Вызовы", justify="right", style="yellow")
+    table.add_column("Всего, мс", justify="right", style="cyan")
+    table.add_column("За ход, мс", justify="right", style="cyan")
+    table.add_column("p50, мкс", justify="right", style="magenta")
+    table.add_column("p99, мкс", justify="right", style="magenta")
+    table.add_column("Макс, мкс", justify="right", style="magenta")
+    top = sorted(stats.items(), key=lambda item: item[1].total, reverse=True)[:limit]
+    for name, stat in top:
+        per_turn = f"{stat.total / turns / 1e6:.3f}" if turns else "-"
+        table.add_row(
+            name,
+            str(stat.count),
+            f"{stat.total / 1e6:.3f}",
+            per_turn,
+            f"{stat.percentile(50) / 1e3:.1f}",
+            f"{stat.percentile(99) / 1e3:.1f}",
+            f"{stat.max / 1e3:.1f}",
+        )
+    return table
+
+
+def render_events(metrics: EventMetrics, limit: int = 10) -> Group:
+    published = Table(title=f"[b blue]События, ходов: {metrics.turns}[/]", title_justify="left")
+    published.add_column("Тип", style="green")
+    published.add_column("Публикации", justify="right", style="yellow")
+    for name, count in sorted(metrics.published.items(), key=lambda item: item[1], reverse=True)[:limit]:
+        published.add_row(name, str(count))
+    return Group(
+        published,
+        render_latency("Слушатели", metrics.listeners, metrics.turns, limit),
+        render_latency("Посредники", metrics.middlewares, metrics.turns, limit),
+    )
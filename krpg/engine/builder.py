@@ -1,23 +1,33 @@
 from __future__ import annotations
 
+import glob
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from typing import Callable
 
 from krpg import ROOT_DIR
 from krpg.bestiary import Bestiary
 from krpg.console import KrpgConsole
+from krpg.engine.cache import cache_path, load_cache, save_cache
 from krpg.engine.executer import NamedScript, generate_named_script
+from krpg.engine.linker import link
 from krpg.engine.npc import Npc
 from krpg.engine.quests import Objective, Quest, Reward, Stage, objectives_names, rewards_names
 from krpg.engine.world import Location
 from krpg.entity.enums import SlotType
 from krpg.entity.inventory import Item, Slot
-from krpg.parser import Section, parse, tokenize
+from krpg.parser import Command, Section, parse, tokenize
 
 
 MAIN_FILE = "main.krpg"
 
 BASE_FOLDER = "content"
 
+# Sending parsed trees back from the pool costs about half of parsing
+# them, smaller rounds and single-core machines parse in place
+PARALLEL_BYTES = 4 << 20
+
 
 def wrap_log[T](
     bestiary: Bestiary,
@@ -107,6 +117,18 @@ def build_location(bestiary: Bestiary, console: KrpgConsole, section: Section) -
         stage_actions = wrap_log(bestiary, console, stage, str(i), create_stage, 2)
         location.stages.append(stage_actions)
 
+    bestiary.add(location)
+
+
+def build_locations(bestiary: Bestiary, console: KrpgConsole, section: Section) -> None:
+    for location in section.all(command=False):
+        assert isinstance(location, Section)
+        assert location.name, "Location id is required"
+        wrap_log(bestiary, console, location, location.name, build_location, 1)
+
+
+def link_location(bestiary: Bestiary, console: KrpgConsole, section: Section) -> None:
+    location = bestiary.strict_get_entity_by_id(section.content[0], Location)
     for item_data in section.all("item"):
         assert len(item_data.args) in (
             1,
@@ -124,17 +146,15 @@ def build_location(bestiary: Bestiary, console: KrpgConsole, section: Section) -
         assert len(npc_data.args) == 1, "Syntax: npc [id]"
         npc_id = npc_data.args[0]
         npc = bestiary.get_entity_by_id(npc_id, Npc)
-        assert npc
+        assert npc, f"Npc {npc_id} not found"
         location.init_npcs.append(npc)
 
-    bestiary.add(location)
 
-
-def build_locations(bestiary: Bestiary, console: KrpgConsole, section: Section) -> None:
+def link_locations(bestiary: Bestiary, console: KrpgConsole, section: Section) -> None:
     for location in section.all(command=False):
         assert isinstance(location, Section)
         assert location.name, "Location id is required"
-        wrap_log(bestiary, console, location, location.name, build_location, 1)
+        wrap_log(bestiary, console, location, location.name, link_location, 1)
 
     for command in section.all(section=False):
         if command.name == "start":
@@ -193,22 +213,76 @@ def build_quests(bestiary: Bestiary, console: KrpgConsole, section: Section) ->
         wrap_log(bestiary, console, quest, quest.name, build_quest, 1)
 
 
-# TODO: bestiary to BESTIARY
-def build(bestiary: Bestiary, console: KrpgConsole) -> None:
+def parse_file(path: str) -> Section:
+    with open(path, "r", encoding="utf-8") as file:
+        return parse(tokenize(file.read()), path)
+
+
+def parse_pack(folder: str) -> tuple[Section, list[str]]:
+    """Parse every .krpg file of the pack and the files they include
+
+    Rounds of several files larger than PARALLEL_BYTES are parsed in one
+    process pool shared by all rounds, includes found in a round form the
+    next one. Top-level sections with the same name are merged in file
+    order, main file first.
+    """
+    main = os.path.join(folder, MAIN_FILE)
+    queue = sorted(glob.glob(os.path.join(folder, "*.krpg")), key=lambda p: (p != main, p))
+    queue = [os.path.abspath(p) for p in queue]
+    sources: list[str] = []
+    result = Section()
+    workers = os.cpu_count() or 1
+    pool: ProcessPoolExecutor | None = None
+    try:
+        while queue:
+            sources.extend(queue)
+            if len(queue) > 1 and workers > 1 and sum(os.path.getsize(path) for path in queue) >= PARALLEL_BYTES:
+                pool = pool or ProcessPoolExecutor(max_workers=workers)
+                roots = list(pool.map(parse_file, queue))
+            else:
+                roots = [parse_file(path) for path in queue]
+
+            includes: list[str] = []
+            for path, root in zip(queue, roots):
+                for child in root.children:
+                    if child.name == "include":
+                        assert isinstance(child, Command) and len(child.args) == 1, "Syntax: include [path]"
+                        include = os.path.abspath(os.path.join(os.path.dirname(path), child.args[0]))
+                        if include not in sources and include not in includes:
+                            includes.append(include)
+                    elif isinstance(child, Section) and (target := result.get(child.name or "", command=False)):
+                        assert isinstance(target, Section)
+                        for item in child.children:
+                            target.add_children(item)
+                    else:
+                        result.add_children(child)
+            queue = includes
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return result, sources
+
+
+def source_files(folder: str) -> list[str]:
+    return glob.glob(f"{folder}/*.krpg")
+
+
+STEPS: list[tuple[str, Callable[[Bestiary, KrpgConsole, Section], None]]] = [
+    ("scenarios", build_scenarios),
+    ("items", build_items),
+    ("npcs", build_npcs),
+    ("locations", build_locations),
+    ("quests", build_quests),
+    ("locations", link_locations),
+]
+
+
+def build(bestiary: Bestiary, console: KrpgConsole, folder: str | None = None) -> list[str]:
     if __package__ is None:
         raise ValueError("Package is not set")
-    path = f"{ROOT_DIR}/{BASE_FOLDER}/{MAIN_FILE}"
-    with open(path, "r", encoding="utf-8") as file:
-        main_scenario = parse(tokenize(file.read()))
-
-    steps = [
-        ("scenarios", build_scenarios),
-        ("items", build_items),
-        ("npcs", build_npcs),
-        ("locations", build_locations),
-        ("quests", build_quests),
-    ]
-    for name, step in steps:
+    main_scenario, sources = parse_pack(folder or f"{ROOT_DIR}/{BASE_FOLDER}")
+
+    for name, step in STEPS:
         section = main_scenario.get(name)
         if section:
             assert isinstance(section, Section)
@@ -220,3 +294,50 @@ def build(bestiary: Bestiary, console: KrpgConsole) -> None:
     assert isinstance(init, Section)
     init_script = generate_named_script(init)
     bestiary.add(init_script)
+    link(bestiary, console, main_scenario, bestiary.data)
+    return sources
+
+
+def compile_content(bestiary: Bestiary, console: KrpgConsole, folder: str | None = None, cache: str | None = None) -> str:
+    """Build content and save it to the cache file, by default in the user cache folder"""
+    folder = folder or f"{ROOT_DIR}/{BASE_FOLDER}"
+    sources = build(bestiary, console, folder)
+    path = cache or cache_path(folder)
+    try:
+        save_cache(bestiary, path, sources)
+    except OSError as e:
+        console.log.debug(f"[Builder] Cache is not saved: {e}")
+    return path
+
+
+def load(bestiary: Bestiary, console: KrpgConsole, folder: str | None = None, cache: str | None = None) -> None:
+    folder = folder or f"{ROOT_DIR}/{BASE_FOLDER}"
+    path = cache or cache_path(folder)
+    try:
+        if load_cache(bestiary, path, source_files(folder)):
+            console.log.debug(f"[Builder] Loaded {len(bestiary.data)} entities from cache")
+            return
+    except Exception as e:  # Broken or outdated cache is rebuilt
+        console.log.debug(f"[Builder] Cache is not loaded: {e}")
+        bestiary.clear()
+    compile_content(bestiary, console, folder, path)
+
+
+_packs: dict[str, Bestiary] = {}
+_packs_lock = threading.Lock()
+
+
+def load_pack(console: KrpgConsole, folder: str | None = None, reload: bool = False) -> Bestiary:
+    """Bestiary of content pack shared by all sessions on it
+
+    Each pack is loaded once per process. Entities are not changed by the
+    game, all session state lives in the Game. Reloading builds a new
+    bestiary for the next sessions, running ones keep the old one.
+    """
+    folder = os.path.abspath(folder or f"{ROOT_DIR}/{BASE_FOLDER}")
+    with _packs_lock:
+        if reload or folder not in _packs:
+            bestiary = Bestiary()
+            load(bestiary, console, folder)
+            _packs[folder] = bestiary
+        return _packs[folder]
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import glob
+import io
+import os
+import pickle
+import zlib
+from typing import IO, Any, Iterable
+
+from krpg import ROOT_DIR
+from krpg.bestiary import Bestiary
+from krpg.data.consts import __version__
+from krpg.utils import Nameable
+
+CACHE_VERSION = 2
+
+# Compiled content depends on the engine classes too, not only on the content files
+ENGINE_FILES = ["**/*.py"]
+
+
+def cache_dir() -> str:
+    """Folder of compiled content of the user, KRPG_CACHE_DIR overrides it"""
+    if folder := os.environ.get("KRPG_CACHE_DIR"):
+        return folder
+    base = os.environ.get("LOCALAPPDATA" if os.name == "nt" else "XDG_CACHE_HOME")
+    return os.path.join(base or os.path.join(os.path.expanduser("~"), ".cache"), "krpg")
+
+
+def cache_path(folder: str) -> str:
+    """Cache file of a content folder, the package itself may be read-only"""
+    return os.path.join(cache_dir(), f"{zlib.crc32(os.path.abspath(folder).encode()):08x}.krpgc")
+
+
+def content_hash(sources: Iterable[str]) -> int:
+    # Files are not read, a changed file gets a new mtime or size
+    files = list(sources)
+    for pattern in ENGINE_FILES:
+        files.extend(glob.glob(os.path.join(ROOT_DIR, pattern), recursive=True))
+    key = f"{CACHE_VERSION}:{__version__}"
+    for path in sorted(set(files)):
+        stat = os.stat(path)
+        key += f"|{path}:{stat.st_mtime_ns}:{stat.st_size}"
+    return zlib.crc32(key.encode())
+
+
+class _CachePickler(pickle.Pickler):
+    """Stores references to other bestiary entities as ids
+
+    Each entity state is pickled flat, so a long chain of linked locations
+    does not turn into a deep recursion.
+    """
+
+    def __init__(self, file: IO[bytes], bestiary: Bestiary) -> None:
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.bestiary = bestiary
+
+    def persistent_id(self, obj: Any) -> str | None:
+        if isinstance(obj, Nameable) and self.bestiary.get_entity_by_id(obj.id, object) is obj:
+            return obj.id
+        return None
+
+
+class _CacheUnpickler(pickle.Unpickler):
+    def __init__(self, file: IO[bytes], entities: dict[str, Any]) -> None:
+        super().__init__(file)
+        self.entities = entities
+
+    def persistent_load(self, pid: str) -> Any:
+        return self.entities[pid]
+
+
+def copy_states(bestiary: Bestiary, entities: list[Any], targets: dict[str, Any]) -> list[dict[str, Any]]:
+    """Deep copy entity states, references to bestiary entities are replaced with targets of the same id"""
+    buffer = io.BytesIO()
+    _CachePickler(buffer, bestiary).dump([entity.__dict__ for entity in entities])
+    buffer.seek(0)
+    return _CacheUnpickler(buffer, targets).load()
+
+
+def save_cache(bestiary: Bestiary, path: str, sources: list[str]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as f:
+        pickle.dump((CACHE_VERSION, content_hash(sources), sources), f, pickle.HIGHEST_PROTOCOL)
+        pickle.dump([(type(entity), entity.id) for entity in bestiary.data], f, pickle.HIGHEST_PROTOCOL)
+        _CachePickler(f, bestiary).dump([entity.__dict__ for entity in bestiary.data])
+    os.replace(temp, path)
+
+
+def load_cache(bestiary: Bestiary, path: str, entries: list[str]) -> bool:
+    """Load compiled content
+
+    Included files are known only after parsing, so the cache keeps the
+    list of sources it was built from and checks them together with the
+    current entry files.
+    """
+    if not os.path.exists(path):
+        return False
+    with open(path, "rb") as f:
+        version, key, sources = pickle.load(f)
+        if version != CACHE_VERSION or not set(map(os.path.abspath, entries)) <= set(sources):
+            return False
+        if key != content_hash(sources):
+            return False
+        shells = [(cls.__new__(cls), entity_id) for cls, entity_id in pickle.load(f)]
+        entities = {entity_id: entity for entity, entity_id in shells}
+        states = _CacheUnpickler(f, entities).load()
+    for (entity, _), state in zip(shells, states):
+        entity.__dict__.update(state)
+        bestiary.add(entity)
+    return True
@@ -8,10 +8,12 @@ from krpg.actions import ActionCategory, ActionManager, action
 from krpg.commands import command
 from krpg.components import component
 from krpg.engine.executer import Ctx, Extension, Predicate, add_predicate, executer_command
+from krpg.events import Event
 from krpg.events_middleware import GameEvent
 from krpg.saves import Savable
 
 if TYPE_CHECKING:
+    from krpg.engine.linker import Linker
     from krpg.game import Game
 
 
@@ -19,6 +21,11 @@ if TYPE_CHECKING:
 class TimepassEvent(GameEvent):
     minutes: int
 
+    def merge(self, other: Event) -> Event | None:
+        if type(other) is TimepassEvent:
+            return TimepassEvent(self.minutes + other.minutes)
+        return None
+
 
 @attr.s(auto_attribs=True)
 class NewdayEvent(GameEvent):
@@ -67,6 +74,9 @@ class TimePredicate(Predicate):
             case _:
                 raise ValueError(f"Invalid time predicate: {args}")
 
+    def version(self, game: Game) -> int:
+        return game.clock.global_minutes
+
     @staticmethod
     def eval(game: Game, type: Literal["before", "after"], hh: int, mm: int, *_) -> bool:
         match type:
@@ -85,20 +95,50 @@ class ClockCommands(ActionManager):
         game.console.print(f"[green]Время: День [yellow]{c.days}[green], [yellow]{c.hours:0>2}:{c.minutes:0>2}[/]")
 
 
+def check_minutes(minutes: Any) -> None:
+    try:
+        value = int(minutes)
+    except (TypeError, ValueError):
+        return  # Expressions are checked when evaluated
+    if value < 0:
+        raise ValueError(f"Negative minutes: {value}")
+
+
+def link_pass(linker: Linker, *args: Any) -> tuple[Any, ...]:
+    match args:
+        case [minutes]:
+            minutes = linker.link_arg(minutes, int)
+            check_minutes(minutes)
+            return (minutes,)
+        case _:
+            raise ValueError("Invalid pass command")
+
+
+def link_wait(linker: Linker, *args: Any) -> tuple[Any, ...]:
+    match args:
+        case [minutes]:
+            check_minutes(minutes)
+            return (linker.expression(minutes),)
+        case ["until", hh, mm]:
+            return ("until", linker.expression(hh), linker.expression(mm))
+        case _:
+            raise ValueError("Invalid wait command")
+
+
 @component
 class ClockExtension(Extension):
-    @executer_command("pass")
+    @executer_command("pass", link=link_pass)
     @staticmethod
-    def passtime(ctx: Ctx, minutes: str) -> None:
-        assert minutes.isdigit()
-        ctx.game.commands.execute(wait(ctx.game.clock, int(minutes)))
+    def passtime(ctx: Ctx, minutes: int) -> None:
+        ctx.game.commands.execute(wait(ctx.game.clock, minutes))
 
-    @executer_command("wait")
+    @executer_command("wait", link=link_wait)
     @staticmethod
-    def wait(ctx: Ctx, *args: str) -> None:
+    def wait(ctx: Ctx, *args: Any) -> None:
         match args:
             case [minutes]:
                 minutes = ctx.executer.evaluate(minutes)
+                check_minutes(minutes)
                 ctx.game.commands.execute(wait(ctx.game.clock, int(minutes)))
             case ["until", hh, mm]:
                 hh = ctx.executer.evaluate(hh)
@@ -1,28 +1,51 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Callable, Generator, Protocol
+import builtins
+import inspect
+from functools import cached_property, lru_cache
+from types import CodeType
+from typing import TYPE_CHECKING, Any, Callable, Generator, Protocol, get_type_hints
 
 import attr
+from rich.text import Text
 
 from krpg.actions import Action, ActionCategory
 from krpg.commands import command
+from krpg.engine.expressions import Expression
+from krpg.engine.npc import Npc
+from krpg.engine.profiler import Profiler
+from krpg.engine.texts import ScriptText, StaticText, TemplateText
+from krpg.engine.variables import VariableStore
 from krpg.events_middleware import GameEvent
-from krpg.parser import Command, Section
+from krpg.parser import Node, Section, freeze
 from krpg.saves import Savable
 from krpg.utils import Nameable
 
 if TYPE_CHECKING:
+    from krpg.console import KrpgConsole
+    from krpg.engine.linker import Linker
     from krpg.game import Game
 
 
 type Enviroment = dict[str, Any]
 
+type CommandTable = dict[str, ExecuterCommand]
+
+# Compiled script line: callback, arguments and children, compiled if they are a script block
+type Step = tuple[ExecuterCommandCallback, tuple[Any, ...], Block | tuple[Node, ...] | None]
+
+type Block = tuple[Step, ...]
+
 
 class ExecuterCommandCallback(Protocol):
     # FIXME: Any to str | children
     def __call__(self, ctx: Ctx, *args: Any, **kwargs: Any) -> None | int: ...
 
 
+class LinkArgs(Protocol):
+    def __call__(self, linker: Linker, *args: Any) -> tuple[Any, ...]: ...
+
+
 class Parse(Protocol):
     def __call__(self, *args: str) -> tuple[Any, int]: ...
 
@@ -36,6 +59,13 @@ class Predicate(Protocol):
     parse: Parse
     eval: Eval
 
+    def link(self, linker: Linker, *args: Any) -> tuple[Any, ...]:
+        return args
+
+    def version(self, game: Game) -> Any:
+        # Results are memoized per game while the version is the same, None disables memoization
+        return None
+
     def __repr__(self) -> str:
         return f"<Predicate {self.name}>"
 
@@ -54,23 +84,175 @@ class ScenarioRun(GameEvent):
     scenario: NamedScript
 
 
+@attr.s(auto_attribs=True)
+class ScenarioResume(GameEvent):
+    scenario: NamedScript
+
+
 @command
 def run_scenario(executer: Executer, scenario: NamedScript) -> Generator[ScenarioRun, Any, None]:
     yield ScenarioRun(scenario)
-    scenario.script.run(executer)
+    executer.run_script(scenario)
+
+
+@command
+def resume_scenario(executer: Executer) -> Generator[ScenarioResume, Any, None]:
+    assert executer.suspended, "No suspended script"
+    yield ScenarioResume(executer.suspended.script)
+    executer.finish()
+
+
+class Continuation(Protocol):
+    def __call__(self, ctx: Ctx, resume: Callable[[], None | int]) -> None | int: ...
+
+
+# How block commands run their resumed children, used to resume suspended scripts
+continuations: dict[ExecuterCommandCallback, Continuation] = {}
 
 
-def executer_command(name: str) -> Callable[[ExecuterCommandCallback], ExecuterCommand]:
+def executer_command(
+    name: str,
+    link: LinkArgs | None = None,
+    script: bool = True,
+    resume: Continuation | None = None,
+) -> Callable[[ExecuterCommandCallback], ExecuterCommand]:
     def wrapper(callback: ExecuterCommandCallback) -> ExecuterCommand:
-        return ExecuterCommand(name, callback)
+        if resume:
+            continuations[inspect.unwrap(callback)] = resume
+        return ExecuterCommand(name, callback, link, script)
 
     return wrapper
 
 
+# Converters of plain arguments by the annotation of the parameter
+COERCIONS: dict[type, Callable[[str], Any]] = {int: int, float: float}
+
+
 class ExecuterCommand:
-    def __init__(self, name: str, callback: ExecuterCommandCallback) -> None:
+    def __init__(self, name: str, callback: ExecuterCommandCallback, link: LinkArgs | None = None, script: bool = True) -> None:
         self.name = name
         self.callback = callback
+        # Custom argument linking, by default arguments are converted by annotations:
+        # entity types are resolved, Expression is compiled, int and float are parsed
+        self.link = link
+        # Children of the command are a script block, not data
+        self.script = script
+
+    @cached_property
+    def signature(self) -> inspect.Signature:
+        return inspect.signature(getattr(self.callback, "__func__", self.callback))
+
+    @cached_property
+    def params(self) -> dict[int, type]:
+        """Types of positional parameters, the linker converts arguments to them"""
+        hints = get_type_hints(getattr(self.callback, "__func__", self.callback))
+        params: dict[int, type] = {}
+        for i, param in enumerate(list(self.signature.parameters.values())[1:]):  # ctx
+            hint = hints.get(param.name)
+            if param.kind != param.POSITIONAL_OR_KEYWORD or param.name == "children" or not isinstance(hint, type):
+                continue
+            if hint in COERCIONS or issubclass(hint, (Nameable, Expression)):
+                params[i] = hint
+        return params
+
+    def check_args(self, args: tuple[Any, ...], children: bool) -> None:
+        try:
+            self.signature.bind(None, *args, **({"children": ()} if children else {}))
+        except TypeError as e:
+            raise ValueError(f"Invalid arguments of {self.name}: {e}") from None
+
+
+def collect_commands(extensions: list[Extension]) -> CommandTable:
+    commands: CommandTable = {}
+    for extension in extensions:
+        for name, cmd in extension.get_commands().items():
+            if name in commands:
+                raise ValueError(f"Command with name {name} already exists")
+            commands[name] = cmd
+    return commands
+
+
+_tables: dict[tuple[type[Extension], ...], CommandTable] = {}
+
+
+def command_table(extensions: list[Extension]) -> CommandTable:
+    """Command table shared by all executers with the same extension types
+
+    Scripts keep the table they were compiled against, so sharing the table
+    lets every session reuse the compiled steps.
+    """
+    key = tuple(type(extension) for extension in extensions)
+    table = _tables.get(key)
+    if table is None:
+        table = _tables[key] = collect_commands(extensions)
+    return table
+
+
+def compile_block(nodes: tuple[Node, ...], commands: CommandTable, profiler: Profiler | None = None) -> Block:
+    steps: list[Step] = []
+    for node in nodes:
+        cmd = commands.get(node.name or "")
+        if cmd is None:
+            raise ValueError(f"Command {node.name} not found at {node.position}")
+        children: Block | tuple[Node, ...] | None = node.children
+        if node.children is not None and cmd.script:
+            children = compile_block(node.children, commands, profiler)
+        callback = cmd.callback
+        if profiler is not None:
+            callback = profiler.wrap(cmd.name, node.source, node.line, callback)
+        steps.append((callback, node.args, children))
+    return tuple(steps)
+
+
+def run_block(ctx: Ctx, block: Block, start: int = 0) -> None | int:
+    index = start
+    try:
+        for index, (callback, args, children) in enumerate(block[start:] if start else block, start):
+            if children is None:
+                returned = callback(ctx, *args)
+            else:
+                returned = callback(ctx, *args, children=children)
+            if returned is not None:
+                return returned
+    except Suspended as e:
+        e.path.insert(0, index)
+        raise
+    return None
+
+
+def resume_block(ctx: Ctx, block: Block, path: list[int]) -> None | int:
+    """Continue block from the step at path, the suspended step is called again"""
+    index, *rest = path
+    callback, args, children = block[index]
+    try:
+        if rest:
+            assert isinstance(children, tuple)
+            # Steps call the staticmethod or its profiled wrapper, both unwrap to the function
+            returned = continuations.get(inspect.unwrap(callback), finish_block)(ctx, lambda: resume_block(ctx, children, rest))  # type: ignore[arg-type]
+        elif children is None:
+            returned = callback(ctx, *args)
+        else:
+            returned = callback(ctx, *args, children=children)
+    except Suspended as e:
+        e.path.insert(0, index)
+        raise
+    if returned is not None:
+        return returned
+    return run_block(ctx, block, index + 1)
+
+
+def finish_block(ctx: Ctx, resume: Callable[[], None | int]) -> None | int:
+    return resume()
+
+
+def finish_require(ctx: Ctx, resume: Callable[[], None | int]) -> None | int:
+    resume()
+    return 0
+
+
+def finish_batch(ctx: Ctx, resume: Callable[[], None | int]) -> None | int:
+    with ctx.game.commands.batch():
+        return resume()
 
 
 class Extension:
@@ -103,97 +285,227 @@ class ValuePredicate(Predicate):
         return game.executer.env.get(key) is not None
 
 
+def link_say(linker: Linker, *args: Any) -> tuple[Any, ...]:
+    if len(args) > 1:
+        speaker = args[0] if args[0] == "you" else linker.resolve(args[0], Npc)
+        # Speech of characters is not a template
+        speech = args[1] if isinstance(args[1], StaticText) else StaticText(" ".join(args[1:]))
+        return speaker, speech
+    return (linker.text(args, "[green]"),)
+
+
+def link_print(linker: Linker, *args: Any) -> tuple[Any, ...]:
+    return (linker.text(args, "[blue]"),)
+
+
+@attr.s(auto_attribs=True, eq=False)
+class Condition:
+    """Predicate with arguments parsed and linked at build time, memoized by identity"""
+
+    name: str
+    args: tuple[Any, ...]
+
+    def eval(self, game: Game) -> bool:
+        return predicates[self.name].eval(game, *self.args)
+
+
+def parse_condition(name: str, *args: str) -> Condition:
+    if name not in predicates:
+        raise ValueError(f"Unknown require predicate: {name}")
+    parsed, consumed = predicates[name].parse(*args)
+    if consumed != len(args):
+        raise ValueError(f"Unexpected arguments of {name} predicate: {args[consumed:]}")
+    return Condition(name, tuple(parsed))
+
+
+def link_require(linker: Linker, name: str | Condition, *args: Any) -> tuple[Any, ...]:
+    condition = name if isinstance(name, Condition) else parse_condition(name, *args)
+    condition.args = tuple(predicates[condition.name].link(linker, *condition.args))
+    return (condition,)
+
+
 class Base(Extension):
-    @executer_command("print")
+    @executer_command("print", link=link_print)
     @staticmethod
-    def builtin_print(ctx: Ctx, *args: str) -> None:
-        game = ctx.game
-        text = " ".join(args)
-        game.console.print("[blue]" + game.executer.process_text(text))
+    def builtin_print(ctx: Ctx, *args: str | ScriptText) -> None:
+        ctx.game.console.print(ctx.executer.render_text(args, "[blue]"))
 
     @executer_command("$")
     @staticmethod
     def builtin_exec(ctx: Ctx, *code: str) -> None:
         exec_str = " ".join(code)
-        env = ctx.executer.env | {"game": ctx.game, "env": ctx.executer.env}
-        exec(exec_str, env)  # noqa
+        exec(compile_code(exec_str, "exec"), Namespace(ctx.game, ctx.executer.env))  # noqa
 
     @executer_command("set")
     @staticmethod
-    def builtin_set(ctx: Ctx, name: str, expr: str) -> None:
+    def builtin_set(ctx: Ctx, name: str, expr: Expression) -> None:
         game = ctx.game
         game.executer.env[name] = ctx.executer.evaluate(expr)  # noqa
 
-    @executer_command("say")
+    @executer_command("say", link=link_say)
     @staticmethod
-    def builtin_say(ctx: Ctx, *args: str) -> None:
+    def builtin_say(ctx: Ctx, *args: Any) -> None:
         game = ctx.game
         if len(args) > 1:
-            id, *text = args
-            speech = " ".join(text)
-            if id == "you":
-                name = f"[white b]{game.player.entity.name}[/][cyan]"
+            speaker, *text = args
+            speech = text[0].text if isinstance(text[0], StaticText) else Text.from_markup(" ".join(text))
+            if speaker == "you":
+                name, style = Text(game.player.entity.name, "white b"), "cyan"
             else:
-                npc = game.npc_manager.npcs[id]
-                assert npc, f"Where is {id} npc?"
-                name = npc.display
-            game.console.print(f"{name}[green]:[/] {speech}")
+                name, style = game.npc_manager.npcs[speaker.id].speaker
+            game.console.print(Text.assemble(name, (":", "green"), " ", speech, style=style))
         else:
-            speech = " ".join(args)
-            game.console.print("[green]" + game.executer.process_text(speech))
+            game.console.print(ctx.executer.render_text(args, "[green]"))
 
     @executer_command("if")
     @staticmethod
-    def builtin_if(ctx: Ctx, expr: str, children: list[Command | Section]) -> None | int:
+    def builtin_if(ctx: Ctx, expr: Expression, children: Block) -> None | int:
         res = ctx.executer.evaluate(expr)
         if res:
-            return ctx.executer.run(Section(children=children))
+            return run_block(ctx, children)
+
+    @executer_command("batch", resume=finish_batch)
+    @staticmethod
+    def builtin_batch(ctx: Ctx, children: Block) -> None | int:
+        # Events of the block are published together when it ends or suspends
+        with ctx.game.commands.batch():
+            return run_block(ctx, children)
 
     @executer_command("return")
     @staticmethod
     def builtin_return(ctx: Ctx):
         return 0
 
-    @executer_command("require")
+    @executer_command("require", link=link_require, resume=finish_require)
     @staticmethod
     def builtin_require(
         ctx: Ctx,
-        name: str,
+        condition: Condition | str,
         *args: str,
-        children: list[Command | Section] | None = None,
+        children: Block | None = None,
     ) -> None | int:
-        if name not in predicates:
-            raise ValueError(f"Unknown require predicate: {name}")
-        parsed, _ = predicates[name].parse(*args)  # TODO: move logic out
-        if not predicates[name].eval(ctx.game, *parsed):
+        # Conditions are parsed when the script is linked, not linked scripts parse them here
+        if isinstance(condition, str):
+            condition = parse_condition(condition, *args)
+        if not ctx.executer.check(condition):
             if children:
-                ctx.executer.run(Section(children=children))
+                run_block(ctx, children)
             return 0
 
 
+@lru_cache(maxsize=4096)
+def compile_code(text: str, mode: str) -> CodeType:
+    return compile(text, "<script>", mode)
+
+
+class Namespace(dict[str, Any]):
+    """Globals for scenario code: game and env on top, env variables below
+
+    Names missing in the dict are looked up in env, so env is not copied on
+    every call. Assignments stay in the namespace and do not change env.
+    """
+
+    def __init__(self, game: Game, env: Enviroment) -> None:
+        super().__init__(game=game, env=env, __builtins__=builtins)
+        self.env = env
+
+    def __missing__(self, key: str) -> Any:
+        return self.env[key]
+
+
+# Marks that a resumed step has no answer to take
+NO_ANSWER: Any = object()
+
+
+@attr.s(auto_attribs=True)
+class InputRequest(Savable):
+    """Choice a suspended script waits for, answered with a list of option values"""
+
+    title: str
+    options: dict[str, int]
+    min: int = 0
+    max: int = 9
+
+    def prompt(self, console: KrpgConsole) -> list[int]:
+        return console.multiple(self.title, self.options, self.min, self.max)
+
+    def check(self, answer: Any) -> None:
+        # Empty answer is a cancelled choice, the console allows it too
+        if not isinstance(answer, list) or answer and not self.min <= len(answer) <= self.max:
+            raise ValueError(f"Expected from {self.min} to {self.max} options")
+        values = set(self.options.values())
+        if any(value not in values for value in answer):
+            raise ValueError(f"Unknown options: {answer}")
+
+    def serialize(self) -> dict[str, Any]:
+        return {"title": self.title, "options": self.options, "min": self.min, "max": self.max}
+
+    @classmethod
+    def deserialize(cls, data: dict[str, Any], *args: Any, **kwargs: Any) -> InputRequest:
+        return cls(**data)
+
+
+class Suspended(Exception):
+    # Path of step indexes is filled while the exception goes up through blocks
+    def __init__(self, request: InputRequest) -> None:
+        super().__init__(request.title)
+        self.request = request
+        self.path: list[int] = []
+
+
 @attr.s(auto_attribs=True)
 class Ctx:
     game: Game
     executer: Executer
     locals: Enviroment = {}
+    # Scripts started with Executer.start suspend on input instead of prompting
+    suspend: bool = False
+    answer: Any = NO_ANSWER
+
+    def ask(self, request: InputRequest, prompt: Callable[[], Any]) -> Any:
+        if self.answer is not NO_ANSWER:
+            answer, self.answer = self.answer, NO_ANSWER
+            return answer
+        if self.suspend:
+            raise Suspended(request)
+        return prompt()
+
+
+# Compiled blocks kept per script, old profilers are dropped first
+COMPILED_VARIANTS = 4
 
 
 @attr.s(auto_attribs=True)
 class Script:
-    section: Section
-    position = 0
+    node: Node
     env: Enviroment = {}
+    # Blocks by the ids of the command table and the profiler, sessions that
+    # share the script may profile it or not at the same time
+    _compiled: dict[tuple[int, int], tuple[CommandTable, Profiler | None, Block]] = attr.ib(factory=lambda: {}, init=False, repr=False, eq=False)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Callbacks are not picklable, steps are compiled again after loading
+        state = self.__dict__.copy()
+        state["_compiled"] = {}
+        return state
+
+    def compile(self, commands: CommandTable, profiler: Profiler | None = None) -> Block:
+        key = (id(commands), id(profiler))
+        compiled = self._compiled.get(key)
+        # The entry keeps both alive, ids are not reused while it is stored
+        if compiled is None:
+            if len(self._compiled) >= COMPILED_VARIANTS:
+                del self._compiled[next(iter(self._compiled))]
+            compiled = self._compiled[key] = (commands, profiler, compile_block(self.node.children or (), commands, profiler))
+        return compiled[2]
 
     def run(self, executer: Executer) -> None | int:
-        self.position = 0
-        while True:
-            if self.position >= len(self.section.children):
-                break
-            command = self.section.children[self.position]
-            returned = executer.execute(command, self.env)
-            self.position += 1
-            if returned is not None:
-                return returned
+        # Scripts are shared by all sessions of the content, run state is kept local
+        return run_block(Ctx(executer.game, executer, self.env), self.compile(executer.commands, executer.profiler))
+
+    @property
+    def position(self) -> str:
+        return f"{self.node.source}:{self.node.line}"
 
 
 @attr.s(auto_attribs=True)
@@ -202,7 +514,14 @@ class NamedScript(Nameable):
 
     @property
     def as_action(self) -> Action:
-        return Action(self.name, self.description, ActionCategory.ACTION, lambda g: self.script.run(g.executer))  #
+        # Run as a command, so the script is journaled with the input it took
+        return Action(self.name, self.description, ActionCategory.ACTION, lambda g: g.commands.execute(run_scenario(g.executer, self)))
+
+    @property
+    def profile_name(self) -> str:
+        # Ids of npc and location actions are not unique, name and position tell them apart
+        name = self.id if self.name == self.id else f"{self.id} {self.name}"
+        return f"{name} {self.script.position}"
 
 
 def generate_named_script(
@@ -233,29 +552,76 @@ def generate_named_script(
         id=id,
         name=name,
         description=description,
-        script=Script(section),
+        script=Script(freeze(section)),
     )
 
 
+@attr.s(auto_attribs=True)
+class Suspension(Savable):
+    script: NamedScript
+    path: list[int]
+    locals: Enviroment
+    request: InputRequest
+
+    def serialize(self) -> dict[str, Any]:
+        from krpg.engine.linker import script_ref
+
+        return {"script": script_ref(self.script), "path": self.path, "locals": self.locals, "request": self.request.serialize()}
+
+    @classmethod
+    def deserialize(cls, data: dict[str, Any], *args: Any, **kwargs: Any) -> Suspension:
+        from krpg.engine.linker import resolve_script
+
+        script = resolve_script(data["script"])
+        return cls(script, list(data["path"]), data["locals"], InputRequest.deserialize(data["request"]))
+
+
 class Executer(Savable):
     def __init__(self, game: Game) -> None:
         self.game = game
         self.extensions: list[Extension] = [Base()]
-        self.env: Enviroment = {}
+        self.env = VariableStore()
+        self._commands: CommandTable | None = None
+        self.suspended: Suspension | None = None
+        # Opt-in, scripts are compiled with profiled steps while it is set
+        self.profiler: Profiler | None = None
+        self.results: dict[Condition, tuple[Any, bool]] = {}
+
+    @property
+    def commands(self) -> CommandTable:
+        if self._commands is None:
+            self._commands = command_table(self.extensions)
+        return self._commands
+
+    def add_extension(self, extension: Extension) -> None:
+        self.extensions.append(extension)
+        self._commands = None
 
     def clear_env(self) -> None:
-        for key in list(self.env.keys()):
-            if key.startswith("_"):
-                del self.env[key]
+        self.env.clear_temporary()
 
     def serialize(self) -> dict[str, Any]:
-        self.clear_env()
+        # Temporary variables belong to the suspended script
+        if self.suspended is None:
+            self.clear_env()
         return self.env
 
+    def serialize_delta(self) -> dict[str, Any]:
+        """Variables changed since the previous delta or checkpoint"""
+        if self.suspended is None:
+            self.clear_env()
+        delta = self.env.delta()
+        self.env.checkpoint()
+        return delta
+
+    def apply_delta(self, delta: dict[str, Any]) -> None:
+        self.env.apply(delta)
+        self.env.checkpoint()
+
     @classmethod
     def deserialize(cls, data: dict[str, Any], game: Game) -> Executer:
         self = cls(game)
-        self.env = data
+        self.env = VariableStore(data)
         return self
 
     def process_text(self, text: str) -> str:
@@ -263,34 +629,75 @@ class Executer(Savable):
         assert isinstance(t, str)
         return t  # noqa
 
-    def evaluate(self, text: str) -> Any:
-        env = self.env | {"game": self.game, "env": self.env}
-        # Scenario allowed to use python code
-        return eval(text, env)  # noqa
-
-    def get_commands(self) -> dict[str, ExecuterCommand]:
-        commands: dict[str, ExecuterCommand] = {}
-        for extension in self.extensions:
-            for name, cmd in extension.get_commands().items():
-                if name in commands:
-                    raise ValueError(f"Command with name {name} already exists")
-                commands[name] = cmd
-        return commands
-
-    def execute(self, command: Command | Section, locals: Enviroment) -> None | int:
-        game = self.game
-        ctx = Ctx(game, self, locals)
-        cmds = self.get_commands()
-        if command.name in cmds:
-            if isinstance(command, Section):
-                return cmds[command.name].callback(ctx, *command.args, children=command.children)
+    def render_text(self, args: tuple[str | ScriptText, ...], style: str = "") -> str | Text:
+        match args:
+            case [StaticText() | TemplateText() as text]:
+                return text.render(self.game, self.env)
+            case _:
+                return style + self.process_text(" ".join(map(str, args)))
+
+    def evaluate(self, text: str | Expression) -> Any:
+        if isinstance(text, Expression):
+            return text(self.game, self.env)
+        # Not linked scripts and templates are allowed to use python code
+        return eval(compile_code(text, "eval"), Namespace(self.game, self.env))  # noqa
+
+    def check(self, condition: Condition) -> bool:
+        version = predicates[condition.name].version(self.game)
+        if version is None:
+            return condition.eval(self.game)
+        cached = self.results.get(condition)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        result = condition.eval(self.game)
+        self.results[condition] = (version, result)
+        return result
+
+    def get_commands(self) -> CommandTable:
+        return self.commands
+
+    def run_script(self, script: NamedScript) -> None:
+        # A run interrupted at the prompt stays suspended and is saved with the game
+        if self.start(script) is not None:
+            self.finish()
+
+    def finish(self) -> None:
+        """Ask for the input the suspended script waits for until it is finished"""
+        while self.suspended is not None:
+            self.resume(self.suspended.request.prompt(self.game.console))
+
+    def start(self, script: NamedScript) -> InputRequest | None:
+        """Run script until it needs input
+
+        The request is returned and the run is kept in `suspended` until
+        `resume` is called with the answer. None is returned when the
+        script is finished.
+        """
+        if self.suspended is not None:
+            raise ValueError(f"Script {self.suspended.script.id} is suspended")
+        ctx = Ctx(self.game, self, script.script.env, suspend=True)
+        return self._drive(script, ctx, lambda block: run_block(ctx, block))
+
+    def resume(self, answer: Any) -> InputRequest | None:
+        suspension = self.suspended
+        if suspension is None:
+            raise ValueError("No suspended script")
+        suspension.request.check(answer)
+        self.suspended = None
+        ctx = Ctx(self.game, self, suspension.locals, suspend=True, answer=answer)
+        return self._drive(suspension.script, ctx, lambda block: resume_block(ctx, block, suspension.path))
+
+    def _drive(self, script: NamedScript, ctx: Ctx, run: Callable[[Block], Any]) -> InputRequest | None:
+        block = script.script.compile(self.commands, self.profiler)
+        try:
+            if self.profiler is None:
+                run(block)
             else:
-                return cmds[command.name].callback(ctx, *command.args)
-        raise ValueError(f"Command {command.name} not found")
-
-    def run(self, section: Section) -> None | int:
-        script = Script(section)
-        return script.run(self)
+                self.profiler.run_script(script.profile_name, run, block)
+        except Suspended as e:
+            self.suspended = Suspension(script, e.path, ctx.locals, e.request)
+            return e.request
+        return None
 
     def __str__(self) -> str:
         return "<Executer>"
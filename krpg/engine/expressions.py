@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import ast
+import operator
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    from krpg.game import Game
+
+type Enviroment = dict[str, Any]
+
+type Evaluator = Callable[[Game, Enviroment], Any]
+
+# Attributes reachable from game, intermediate objects are allowed implicitly
+ALLOWED_ATTRIBUTES = {
+    "game.random.random",
+    "game.random.randint",
+    "game.random.choice",
+    "game.random.choices",
+    "game.clock.days",
+    "game.clock.hours",
+    "game.clock.minutes",
+    "game.clock.today_minutes",
+    "game.clock.in_range",
+}
+
+ALLOWED_PATHS = {path.rsplit(".", i)[0] for path in ALLOWED_ATTRIBUTES for i in range(path.count("."))}
+
+BUILTINS: dict[str, Callable[..., Any]] = {
+    "abs": abs,
+    "bool": bool,
+    "int": int,
+    "len": len,
+    "max": max,
+    "min": min,
+    "round": round,
+    "str": str,
+}
+
+BINARY_OPERATORS: dict[type[ast.operator], Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+UNARY_OPERATORS: dict[type[ast.unaryop], Callable[[Any], Any]] = {
+    ast.Not: operator.not_,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+COMPARE_OPERATORS: dict[type[ast.cmpop], Callable[[Any, Any], Any]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+}
+
+# Conversions of f-string placeholders: {x}, {x!s}, {x!r}, {x!a}
+CONVERSIONS: dict[int, Callable[[Any], str] | None] = {-1: None, ord("s"): str, ord("r"): repr, ord("a"): ascii}
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+class Expression:
+    """Scenario expression compiled into closures
+
+    Only the subset of python used by scenario conditions is supported:
+    literals, env variables, arithmetic, comparisons, boolean logic and
+    calls of allowed game attributes and builtins.
+    """
+
+    def __init__(self, text: str, func: Evaluator, names: frozenset[str], attributes: frozenset[str]) -> None:
+        self.text = text
+        self.func = func
+        # Env variables and game attributes the expression reads
+        self.names = names
+        self.attributes = attributes
+
+    def __call__(self, game: Game, env: Enviroment) -> Any:
+        return self.func(game, env)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return compile_expression, (self.text,)
+
+    def __repr__(self) -> str:
+        return f"<Expression {self.text!r}>"
+
+
+class _Compiler:
+    def __init__(self) -> None:
+        self.names: set[str] = set()
+        self.attributes: set[str] = set()
+
+    def compile(self, node: ast.AST) -> Evaluator:
+        method = getattr(self, f"compile_{type(node).__name__}", None)
+        if method is None:
+            raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+        return method(node)
+
+    def compile_Expression(self, node: ast.Expression) -> Evaluator:
+        return self.compile(node.body)
+
+    def compile_Constant(self, node: ast.Constant) -> Evaluator:
+        value = node.value
+        return lambda game, env: value
+
+    def compile_Name(self, node: ast.Name) -> Evaluator:
+        name = node.id
+        if name == "game":
+            raise ExpressionError("game can be used only to access allowed attributes")
+        if name == "env":
+            return lambda game, env: env
+        if name in BUILTINS:
+            raise ExpressionError(f"{name} can be only called")
+        self.names.add(name)
+
+        def load(game: Game, env: Enviroment) -> Any:
+            try:
+                return env[name]
+            except KeyError:
+                raise NameError(f"name '{name}' is not defined") from None
+
+        return load
+
+    def attribute_path(self, node: ast.expr) -> str | None:
+        parts: list[str] = []
+        while isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name) or node.id != "game":
+            return None
+        return ".".join(["game", *reversed(parts)])
+
+    def compile_Attribute(self, node: ast.Attribute) -> Evaluator:
+        path = self.attribute_path(node)
+        if path is None:
+            raise ExpressionError(f"Attribute {node.attr} is allowed only on game")
+        if path not in ALLOWED_ATTRIBUTES and path not in ALLOWED_PATHS:
+            raise ExpressionError(f"Attribute {path} is not allowed")
+        self.attributes.add(path)
+        getter = operator.attrgetter(path.removeprefix("game."))
+        return lambda game, env: getter(game)
+
+    def compile_Call(self, node: ast.Call) -> Evaluator:
+        if node.keywords:
+            raise ExpressionError("Keyword arguments are not supported")
+        args = [self.compile(arg) for arg in node.args]
+        if isinstance(node.func, ast.Name) and node.func.id in BUILTINS:
+            builtin = BUILTINS[node.func.id]
+            return lambda game, env: builtin(*[arg(game, env) for arg in args])
+        if not isinstance(node.func, ast.Attribute):
+            raise ExpressionError("Only builtins and game methods can be called")
+        func = self.compile_Attribute(node.func)
+        return lambda game, env: func(game, env)(*[arg(game, env) for arg in args])
+
+    def compile_BinOp(self, node: ast.BinOp) -> Evaluator:
+        op = BINARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        left, right = self.compile(node.left), self.compile(node.right)
+        return lambda game, env: op(left(game, env), right(game, env))
+
+    def compile_UnaryOp(self, node: ast.UnaryOp) -> Evaluator:
+        op = UNARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        operand = self.compile(node.operand)
+        return lambda game, env: op(operand(game, env))
+
+    def compile_BoolOp(self, node: ast.BoolOp) -> Evaluator:
+        values = [self.compile(value) for value in node.values]
+        if isinstance(node.op, ast.And):
+
+            def and_(game: Game, env: Enviroment) -> Any:
+                result = None
+                for value in values:
+                    result = value(game, env)
+                    if not result:
+                        return result
+                return result
+
+            return and_
+
+        def or_(game: Game, env: Enviroment) -> Any:
+            result = None
+            for value in values:
+                result = value(game, env)
+                if result:
+                    return result
+            return result
+
+        return or_
+
+    def compile_Compare(self, node: ast.Compare) -> Evaluator:
+        first = self.compile(node.left)
+        ops = [COMPARE_OPERATORS[type(op)] for op in node.ops]
+        comparators = [self.compile(comparator) for comparator in node.comparators]
+        if len(ops) == 1:
+            op, second = ops[0], comparators[0]
+            return lambda game, env: op(first(game, env), second(game, env))
+
+        def compare(game: Game, env: Enviroment) -> bool:
+            left = first(game, env)
+            for op, comparator in zip(ops, comparators):
+                right = comparator(game, env)
+                if not op(left, right):
+                    return False
+                left = right
+            return True
+
+        return compare
+
+    def compile_IfExp(self, node: ast.IfExp) -> Evaluator:
+        test, body, orelse = self.compile(node.test), self.compile(node.body), self.compile(node.orelse)
+        return lambda game, env: body(game, env) if test(game, env) else orelse(game, env)
+
+    def compile_Subscript(self, node: ast.Subscript) -> Evaluator:
+        if isinstance(node.value, ast.Name) and node.value.id == "env" and isinstance(node.slice, ast.Constant):
+            self.names.add(str(node.slice.value))
+        value, key = self.compile(node.value), self.compile(node.slice)
+        return lambda game, env: value(game, env)[key(game, env)]
+
+    def compile_JoinedStr(self, node: ast.JoinedStr) -> Evaluator:
+        parts = [self.compile(value) for value in node.values]
+        return lambda game, env: "".join([part(game, env) for part in parts])
+
+    def compile_FormattedValue(self, node: ast.FormattedValue) -> Evaluator:
+        value = self.compile(node.value)
+        conversion = CONVERSIONS[node.conversion]
+        spec = self.compile(node.format_spec) if node.format_spec else None
+
+        def formatted(game: Game, env: Enviroment) -> str:
+            result = value(game, env)
+            if conversion is not None:
+                result = conversion(result)
+            return format(result, spec(game, env) if spec else "")
+
+        return formatted
+
+    def compile_List(self, node: ast.List) -> Evaluator:
+        items = [self.compile(item) for item in node.elts]
+        return lambda game, env: [item(game, env) for item in items]
+
+    def compile_Tuple(self, node: ast.Tuple) -> Evaluator:
+        items = [self.compile(item) for item in node.elts]
+        return lambda game, env: tuple(item(game, env) for item in items)
+
+
+@lru_cache(maxsize=4096)
+def compile_expression(text: str) -> Expression:
+    """Compile scenario expression, ExpressionError is raised for unsupported syntax"""
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid expression {text!r}: {e.msg}") from None
+    compiler = _Compiler()
+    func = compiler.compile(tree)
+    return Expression(text, func, frozenset(compiler.names), frozenset(compiler.attributes))
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import importlib
+import os
+import struct
+import time
+from enum import Enum
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Iterator
+
+import msgpack  # type: ignore
+
+from krpg.actions import Action
+from krpg.bestiary import get_bestiary, use_bestiary
+from krpg.commands import Command
+from krpg.engine.executer import NamedScript
+from krpg.engine.linker import resolve_script, script_ref
+from krpg.engine.npc import NpcState
+from krpg.engine.world import LocationState
+from krpg.entity.inventory import Slot
+from krpg.utils import Nameable
+
+if TYPE_CHECKING:
+    from krpg.game import Game, GameBase
+
+# Every record is prefixed with its length
+LENGTH = struct.Struct(">I")
+
+# Game attributes commands get as arguments, journaled by name
+ROOTS = ("world", "npc_manager", "quest_manager", "executer", "player", "clock", "random")
+
+SCALARS = (type(None), bool, int, float, str)
+
+
+class JournalError(ValueError):
+    pass
+
+
+def import_object(path: str) -> Any:
+    module, _, qualname = path.partition(":")
+    obj: Any = importlib.import_module(module)
+    for name in qualname.split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+def command_name(command: Command[...]) -> str:
+    callback = command.callback
+    return f"{callback.__module__}:{callback.__qualname__}"
+
+
+def load_command(name: str) -> Command[...]:
+    try:
+        command = import_object(name)
+    except (ImportError, AttributeError):
+        raise JournalError(f"Unknown command {name}") from None
+    if not isinstance(command, Command):
+        raise JournalError(f"{name} is not a command")
+    return command
+
+
+def index_of(items: list[Any], value: Any) -> int | None:
+    return next((i for i, item in enumerate(items) if item is value), None)
+
+
+def encode(game: Game, value: Any) -> Any:
+    """Plain value or a reference to an object of the game and the content"""
+    if isinstance(value, Enum):
+        return ["enum", f"{type(value).__module__}:{type(value).__qualname__}", value.value]
+    if type(value) in SCALARS:
+        return value
+    if value is game:
+        return ["game"]
+    for name in ROOTS:
+        if value is getattr(game, name):
+            return ["root", name]
+    if isinstance(value, (list, tuple)):
+        return ["list", [encode(game, item) for item in value]]
+    if isinstance(value, NpcState):
+        return ["npc", value.npc.id]
+    if isinstance(value, LocationState):
+        return ["location", value.location.id]
+    inventory = game.player.entity.inventory
+    if value is inventory:
+        return ["inventory"]
+    if isinstance(value, Slot):
+        # Slots of the inventory or items lying in a location
+        if (index := index_of(inventory.slots, value)) is not None:
+            return ["slot", None, index]
+        for loc in game.world.locations:
+            if (index := index_of(loc.items, value)) is not None:
+                return ["slot", loc.location.id, index]
+    if isinstance(value, NamedScript):
+        try:
+            return ["script", script_ref(value)]
+        except ValueError:
+            raise JournalError(f"Can't journal script {value.id}, it is not a part of the content") from None
+    if isinstance(value, Nameable) and get_bestiary().get_entity_by_id(value.id, type(value)) is value:
+        return ["entity", value.id]
+    if isinstance(value, Action):
+        # Actions are rebuilt without the callback, commands only pass them to events
+        return ["action", value.name, value.description, str(value.category)]
+    raise JournalError(f"Can't journal argument of type {type(value).__name__}")
+
+
+def decode(game: Game, data: Any) -> Any:
+    if not isinstance(data, list):
+        return data
+    match data:
+        case ["enum", path, value]:
+            return import_object(path)(value)
+        case ["game"]:
+            return game
+        case ["root", name]:
+            return getattr(game, name)
+        case ["list", items]:
+            return [decode(game, item) for item in items]
+        case ["npc", npc_id]:
+            return game.npc_manager.npcs[npc_id]
+        case ["location", loc_id]:
+            return location(game, loc_id)
+        case ["inventory"]:
+            return game.player.entity.inventory
+        case ["slot", None, index]:
+            return game.player.entity.inventory.slots[index]
+        case ["slot", loc_id, index]:
+            return location(game, loc_id).items[index]
+        case ["script", ref]:
+            try:
+                return resolve_script(ref)
+            except (ValueError, IndexError):
+                raise JournalError(f"Unknown script {ref}") from None
+        case ["entity", entity_id]:
+            entity = get_bestiary().get_entity_by_id(entity_id, object)
+            if entity is None:
+                raise JournalError(f"Unknown entity {entity_id}")
+            return entity
+        case ["action", name, description, category]:
+            return Action(name, description, category, lambda game: None)
+    raise JournalError(f"Unknown reference {data}")
+
+
+def location(game: Game, loc_id: str) -> LocationState:
+    loc = game.world.get_location_by_id(loc_id)
+    if not loc:
+        raise JournalError(f"Unknown location {loc_id}")
+    return loc
+
+
+def read_records(file: BinaryIO) -> Iterator[Any]:
+    """Records of the journal, a record torn by a crash ends it and the file is left at its start"""
+    while True:
+        offset = file.tell()
+        header = file.read(LENGTH.size)
+        size = LENGTH.unpack(header)[0] if len(header) == LENGTH.size else -1
+        data = file.read(size) if size >= 0 else b""
+        if size < 0 or len(data) < size:
+            file.seek(offset)
+            return
+        yield msgpack.loads(data)
+
+
+class Journal:
+    """Append-only log of the commands executed by the game
+
+    A journal starts with the seed of a new game or with a snapshot of a
+    loaded one, later snapshots make the tail to replay shorter. Commands
+    are saved with their arguments as references, the random state and the
+    answers given while they ran, replay feeds the answers back.
+    """
+
+    def __init__(self, game: Game, file: BinaryIO, snapshot: bool = False) -> None:
+        self.game = game
+        self.file = file
+        # Later snapshots save only the variables changed since the previous one
+        self.has_snapshot = snapshot
+
+    @classmethod
+    def create(cls, game: Game, path: str) -> Journal:
+        """Start a new journal, an existing one is moved aside and can still be replayed"""
+        if backup := rotate(path):
+            game.console.print(f"[yellow]Прежний журнал сохранён в {backup}[/]")
+        return cls(game, open(path, "xb"))
+
+    def write(self, record: list[Any]) -> None:
+        data: bytes = msgpack.dumps(record)  # type: ignore
+        self.file.write(LENGTH.pack(len(data)) + data)
+        self.file.flush()
+
+    def start(self) -> None:
+        self.write(["start", self.game.random.seed, self.game.random.state])
+
+    def snapshot(self) -> None:
+        data = self.game.serialize()
+        executer = self.game.executer
+        # Temporary variables of a suspended script are saved in full only
+        if self.has_snapshot and executer.suspended is None:
+            data["executer"] = executer.serialize_delta()
+            self.write(["delta", data])
+        else:
+            self.write(["snapshot", data])
+            executer.env.checkpoint()
+            self.has_snapshot = True
+
+    def record(self, command: Command[...], run: Callable[[Command[...]], Any]) -> Any:
+        game = self.game
+        # Arguments are references to the state before the command
+        name = command_name(command)
+        with use_bestiary(game.bestiary):
+            args = [encode(game, arg) for arg in command.args]
+            kwargs = {key: encode(game, value) for key, value in command.kwargs.items()}
+        state = game.random.state
+        tape: list[Any] = []
+        game.console.tape = tape
+        try:
+            result = run(command)
+        finally:
+            game.console.tape = None
+        self.write(["command", name, args, kwargs, state, tape])
+        return result
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def rotate(path: str) -> str | None:
+    """Rename an existing journal to a timestamped backup, the new path is returned"""
+    if not os.path.exists(path):
+        return None
+    root, ext = os.path.splitext(path)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    backup = f"{root}-{stamp}{ext}"
+    n = 1
+    while os.path.exists(backup):
+        n += 1
+        backup = f"{root}-{stamp}-{n}{ext}"
+    os.replace(path, backup)
+    return backup
+
+
+def apply(game: Game, record: list[Any]) -> None:
+    _, name, args, kwargs, state, tape = record
+    if game.random.state != state:
+        raise JournalError(f"Replay diverged before {name}: random state {game.random.state}, journaled {state}")
+    command = load_command(name)
+    console = game.console
+    console.queue.extend(tape)
+    # References and the command resolve entities in the session's bestiary
+    with use_bestiary(game.bestiary):
+        game.commands.execute(command(*[decode(game, arg) for arg in args], **{key: decode(game, value) for key, value in kwargs.items()}))
+    if console.queue:
+        console.queue.clear()
+        raise JournalError(f"Replay diverged in {name}: not all answers were taken")
+
+
+def replay(base: GameBase, path: str) -> Game:
+    """Rebuild the game from the journal and keep journaling to it
+
+    The game is restored from the last snapshot or from the seed, then the
+    commands after it are executed again with their output hidden. Variables
+    of a delta snapshot are rebuilt from the full one before it.
+    """
+    from krpg.game import Game
+
+    with open(path, "r+b") as file:
+        records = list(read_records(file))
+        file.truncate()
+    start = next((i for i in reversed(range(len(records))) if records[i][0] in ("start", "snapshot", "delta")), None)
+    if start is None:
+        raise JournalError("Journal has no start")
+    match records[start]:
+        case ["snapshot", data]:
+            game = Game.deserialize(data, base)
+        case ["delta", data]:
+            full = next((i for i in reversed(range(start)) if records[i][0] == "snapshot"), None)
+            if full is None:
+                raise JournalError("Journal has no snapshot before the delta")
+            game = Game.deserialize({**data, "executer": records[full][1]["executer"]}, base)
+            for record in records[full + 1 : start + 1]:
+                if record[0] == "delta":
+                    game.executer.apply_delta(record[1]["executer"])
+        case ["start", seed, state]:
+            game = Game(base, seed)
+            if game.random.state != state:
+                raise JournalError(f"Replay diverged in init: random state {game.random.state}, journaled {state}")
+        case record:
+            raise JournalError(f"Unknown record {record[0]}")
+    with base.console.console.capture(), use_bestiary(game.bestiary):
+        for record in records[start + 1 :]:
+            apply(game, record)
+    game.commands.journal = Journal(game, open(path, "ab"), any(record[0] == "snapshot" for record in records))
+    return game
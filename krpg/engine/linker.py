@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from typing import Any
+
+import attr
+
+from krpg.bestiary import Bestiary, get_bestiary
+from krpg.components import registry
+from krpg.console import KrpgConsole
+from krpg.engine.executer import COERCIONS, Base, CommandTable, Extension, NamedScript, command_table
+from krpg.engine.expressions import Expression, compile_expression
+from krpg.engine.npc import Npc
+from krpg.engine.texts import ScriptText, StaticText, TemplateText, compile_text
+from krpg.engine.quests import Quest
+from krpg.engine.world import Location
+from krpg.parser import Node, Section
+
+# Extensions register their commands on import
+from krpg.engine import clock  # noqa: F401
+from krpg.entity import inventory  # noqa: F401
+
+
+def extension_commands() -> CommandTable:
+    # Same extensions in the same order as Game.register adds them to the executer
+    extensions: list[Extension] = [Base()]
+    extensions.extend(c() for c in registry.components if isinstance(c, type) and issubclass(c, Extension))
+    return command_table(extensions)
+
+
+class LinkError(ValueError):
+    def __init__(self, errors: list[str]) -> None:
+        super().__init__(f"{len(errors)} link errors:\n" + "\n".join(errors))
+        self.errors = errors
+
+
+@attr.s(auto_attribs=True)
+class Linker:
+    """Resolves ids in scripts, goals and rewards to entities
+
+    Errors are collected with positions of the failed commands and raised
+    together by raise_errors.
+    """
+
+    bestiary: Bestiary
+    commands: CommandTable = attr.ib(factory=extension_commands, repr=False)
+    errors: list[str] = attr.ib(factory=lambda: [])
+    position: str = "<unknown>"
+
+    def error(self, message: str) -> None:
+        self.errors.append(f"{self.position}: {message}")
+
+    def resolve[T](self, ref: str | T, expected: type[T]) -> T:
+        if isinstance(ref, expected):
+            return ref
+        assert isinstance(ref, str)
+        obj = self.bestiary.get_entity_by_id(ref, object)
+        if not isinstance(obj, expected):
+            raise ValueError(f"{expected.__name__} {ref} not found")
+        return obj
+
+    def expression(self, text: str | Expression) -> Expression:
+        if isinstance(text, Expression):
+            return text
+        return compile_expression(text)
+
+    def text(self, parts: tuple[Any, ...], style: str = "") -> ScriptText:
+        if len(parts) == 1 and isinstance(parts[0], (StaticText, TemplateText)):
+            return parts[0]
+        return compile_text(" ".join(parts), style)
+
+    def check(self, ref: str, expected: type) -> None:
+        try:
+            self.resolve(ref, expected)
+        except ValueError as e:
+            self.error(str(e))
+
+    def link_arg(self, arg: Any, expected: type | None) -> Any:
+        if expected is None or isinstance(arg, expected):
+            return arg
+        if expected is Expression:
+            return self.expression(arg)
+        if expected in COERCIONS:
+            try:
+                return COERCIONS[expected](arg)
+            except ValueError:
+                raise ValueError(f"Expected {expected.__name__}, got {arg!r}") from None
+        return self.resolve(arg, expected)
+
+    def link_node(self, node: Node) -> Node:
+        self.position = node.position
+        cmd = self.commands.get(node.name or "")
+        if not cmd:
+            self.error(f"Unknown command {node.name}")
+            return node
+        args = node.args
+        try:
+            if cmd.link:
+                args = cmd.link(self, *args)
+            else:
+                args = tuple(self.link_arg(arg, cmd.params.get(i)) for i, arg in enumerate(args))
+            cmd.check_args(args, node.children is not None)
+        except (ValueError, AssertionError) as e:
+            self.error(str(e))
+        children = node.children
+        if children is not None and cmd.script:
+            children = tuple(self.link_node(child) for child in children)
+        return node._replace(args=args, children=children)
+
+    def link_script(self, script: NamedScript) -> None:
+        node = script.script.node
+        children = tuple(self.link_node(child) for child in node.children or ())
+        script.script.node = node._replace(children=children)
+        if not self.errors:
+            script.script.compile(self.commands)
+
+    def link_quest(self, quest: Quest, section: Section) -> None:
+        for stage, stage_data in zip(quest.stages, section.all()):
+            assert isinstance(stage_data, Section)
+            for objective, goal in zip(stage.objectives, stage_data.all("goal")):
+                self.position = goal.position
+                objective.link(self)
+            for reward, end in zip(stage.rewards, stage_data.all("end")):
+                self.position = end.position
+                try:
+                    reward.link(self)
+                except ValueError as e:
+                    self.error(str(e))
+
+    def raise_errors(self) -> None:
+        if self.errors:
+            raise LinkError(self.errors)
+
+
+def scripts_of(entity: Any) -> list[NamedScript]:
+    if isinstance(entity, NamedScript):
+        return [entity]
+    if isinstance(entity, (Npc, Location)):
+        return [script for stage in entity.stages for script in stage]
+    return []
+
+
+def script_ref(script: NamedScript) -> list[Any]:
+    # Dialogue scripts are not entities, they are referenced by the owner id and index
+    for entity in get_bestiary().data:
+        for index, owned in enumerate(scripts_of(entity)):
+            if owned is script:
+                return [entity.id, index]
+    raise ValueError(f"Script {script.id} is not a part of the content")
+
+
+def resolve_script(ref: list[Any]) -> NamedScript:
+    owner, index = ref
+    return scripts_of(get_bestiary().strict_get_entity_by_id(owner, object))[index]
+
+
+def link(bestiary: Bestiary, console: KrpgConsole, root: Section, entities: list[Any]) -> None:
+    """Link scripts and quests of built entities, the whole content is checked in one pass"""
+    linker = Linker(bestiary)
+    quests = root.get("quests", command=False)
+    for entity in entities:
+        for script in scripts_of(entity):
+            linker.link_script(script)
+        if isinstance(entity, Quest) and isinstance(quests, Section) and (section := quests.get(entity.id, command=False)):
+            assert isinstance(section, Section)
+            linker.link_quest(entity, section)
+    console.log.debug(f"[Builder] Linked {len(entities)} entities, {len(linker.errors)} errors")
+    linker.raise_errors()
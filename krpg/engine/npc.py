@@ -4,9 +4,10 @@ import hashlib
 from typing import TYPE_CHECKING, Any, Generator
 
 import attr
+from rich.text import Text
 
 from krpg.actions import Action, ActionCategory, ActionManager, action
-from krpg.bestiary import BESTIARY
+from krpg.bestiary import get_bestiary
 from krpg.commands import command
 from krpg.components import component
 from krpg.events_middleware import GameEvent
@@ -69,7 +70,7 @@ class NpcState(Savable):
 
     @classmethod
     def deserialize(cls, data: Any, *args: Any, **kwargs: Any) -> NpcState:
-        npc = BESTIARY.strict_get_entity_by_id(data["npc"], Npc)
+        npc = get_bestiary().strict_get_entity_by_id(data["npc"], Npc)
         if not npc:
             raise ValueError(f"Unknown NPC ID: {data['npc']}")
         return cls(npc=npc, known=data["known"], stage=data["stage"])
@@ -82,6 +83,13 @@ class NpcState(Savable):
     def display(self) -> str:
         return f"[{self.npc.color}]{self.npc.name}[{self.npc.color2}]" if self.known else "[gray]???[/]"
 
+    @property
+    def speaker(self) -> tuple[Text, str]:
+        # Same as display: name and the style left open for the speech
+        if self.known:
+            return Text(self.npc.name, self.npc.color), self.npc.color2
+        return Text("???", "gray"), ""
+
     @classmethod
     def from_npc(cls, npc: Npc) -> NpcState:
         return cls(npc=npc)
@@ -120,10 +128,20 @@ class NpcManager(Savable):
         return instance
 
     def __attrs_post_init__(self):
-        all_npcs = BESTIARY.get_all(Npc)
+        all_npcs = get_bestiary().get_all(Npc)
         for npc in all_npcs:
             self.npcs[npc.id] = NpcState.from_npc(npc)
 
+    def refresh(self) -> None:
+        bestiary = get_bestiary()
+        self.npcs = {npc_id: state for npc_id, state in self.npcs.items() if npc_id in bestiary}
+        for npc in bestiary.get_all(Npc):
+            state = self.npcs.get(npc.id)
+            if not state:
+                self.npcs[npc.id] = NpcState.from_npc(npc)
+            else:
+                state.stage = min(state.stage, max(len(npc.stages) - 1, 0))
+
     def get_states(self, npcs: list[Npc]) -> list[NpcState]:
         states: list[NpcState] = []
         for npc in npcs:
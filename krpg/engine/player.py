@@ -1,16 +1,18 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Generator
 
 from krpg.actions import ActionCategory, ActionManager, action
+from krpg.commands import command
 from krpg.components import component
 from krpg.console.entities import render_entity, render_item
 from krpg.console.world import render_location_info
 from krpg.entity.entity import Entity
-from krpg.entity.inventory import Slot, drop, equip, pickup
+from krpg.entity.inventory import Inventory, PickupEvent, Slot, drop, equip
 from krpg.saves import Savable
 
 
 if TYPE_CHECKING:
+    from krpg.engine.world import LocationState
     from krpg.game import Game
 
 from krpg.console.entities import render_inventory
@@ -22,6 +24,16 @@ def display_slot(slot: Slot) -> str:
     return "[red]Пусто[/]"
 
 
+@command
+def take(inventory: Inventory, loc: LocationState, slot: Slot) -> Generator[PickupEvent, Any, None]:
+    assert slot.item
+    left = inventory.pickup(slot.item, slot.count)
+    yield PickupEvent(slot.item, slot.count)
+    slot.count = left or 0
+    if slot.empty:
+        loc.items.remove(slot)  # TODO: move logic to inventory
+
+
 @component
 class Actions(ActionManager):
     @action("me", "Показать информацию о себе", ActionCategory.INFO)
@@ -93,10 +105,7 @@ class Actions(ActionManager):
         slot: Slot | None = console.list_select("Выберите предмет: ", loc.items, display_slot)
         if not slot or not slot.item:
             return
-        res: None | int = game.commands.execute(pickup(game.player.entity.inventory, slot.item, slot.count))
-        slot.count = res if res else 0
-        if slot.empty:
-            loc.items.remove(slot)  # TODO: move logic to inventory
+        game.commands.execute(take(game.player.entity.inventory, loc, slot))
 
 
 class Player(Savable):
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Callable
+
+import attr
+
+
+@attr.s(auto_attribs=True)
+class Stat:
+    calls: int = 0
+    # Cumulative time includes nested commands and scripts, own time does not
+    total: float = 0.0
+    own: float = 0.0
+
+    def serialize(self) -> dict[str, Any]:
+        return {"calls": self.calls, "total": self.total, "own": self.own}
+
+
+@attr.s(auto_attribs=True)
+class Profiler:
+    """Time of executer commands, named scripts and source lines
+
+    Scripts are compiled with profiled steps while the profiler is set on
+    the executer, the default compiled steps are not changed.
+    """
+
+    commands: dict[str, Stat] = attr.ib(factory=lambda: {})
+    scripts: dict[str, Stat] = attr.ib(factory=lambda: {})
+    lines: dict[str, Stat] = attr.ib(factory=lambda: {})
+    # Own time for every stack of frames, for flame graphs
+    stacks: dict[tuple[str, ...], float] = attr.ib(factory=lambda: {}, repr=False)
+    clock: Callable[[], float] = attr.ib(default=time.perf_counter, repr=False)
+    _frames: list[str] = attr.ib(factory=lambda: [], init=False, repr=False)
+    _children: list[float] = attr.ib(factory=lambda: [], init=False, repr=False)
+
+    def call[T](self, frame: str, stats: tuple[Stat, ...], func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        self._frames.append(frame)
+        self._children.append(0.0)
+        start = self.clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = self.clock() - start
+            own = elapsed - self._children.pop()
+            if self._children:
+                self._children[-1] += elapsed
+            for stat in stats:
+                stat.calls += 1
+                stat.total += elapsed
+                stat.own += own
+            stack = tuple(self._frames)
+            self.stacks[stack] = self.stacks.get(stack, 0.0) + own
+            self._frames.pop()
+
+    def wrap(self, name: str, source: str, line: int, callback: Callable[..., Any]) -> Callable[..., Any]:
+        frame = f"{name} {source}:{line}"
+        location = f"{source}:{line}"
+
+        def profiled(*args: Any, **kwargs: Any) -> Any:
+            command = self.commands.setdefault(name, Stat())
+            stat = self.lines.setdefault(location, Stat())
+            return self.call(frame, (command, stat), callback, *args, **kwargs)
+
+        # Resuming a suspended script looks up the command by its callback
+        profiled.__wrapped__ = callback  # type: ignore[attr-defined]
+        return profiled
+
+    def run_script[T](self, name: str, func: Callable[..., T], *args: Any) -> T:
+        return self.call(name, (self.scripts.setdefault(name, Stat()),), func, *args)
+
+    def reset(self) -> None:
+        self.commands.clear()
+        self.scripts.clear()
+        self.lines.clear()
+        self.stacks.clear()
+
+    def serialize(self) -> dict[str, Any]:
+        return {
+            "commands": {name: stat.serialize() for name, stat in self.commands.items()},
+            "scripts": {name: stat.serialize() for name, stat in self.scripts.items()},
+            "lines": {name: stat.serialize() for name, stat in self.lines.items()},
+        }
+
+    def collapsed(self) -> str:
+        # Brendan Gregg's folded format, values are microseconds of own time
+        lines = [f"{';'.join(frame.replace(';', ',') for frame in stack)} {round(own * 1e6)}" for stack, own in self.stacks.items()]
+        return "\n".join(sorted(lines)) + "\n"
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                json.dump(self.serialize(), f, indent=4, ensure_ascii=False)
+            else:
+                f.write(self.collapsed())
@@ -1,25 +1,26 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Any, Callable, Generator
+from typing import TYPE_CHECKING, Any, Callable, Generator, Iterable
 
 import attr
 from rich.tree import Tree
 
 from krpg.actions import ActionCategory, ActionManager, action
-from krpg.bestiary import BESTIARY
+from krpg.bestiary import get_bestiary
 from krpg.commands import Command, command
 from krpg.components import component
 from krpg.engine.executer import Ctx, Extension, NamedScript, Predicate, executer_command, add_predicate, run_scenario
-from krpg.engine.npc import TalkNpc, introduce
-from krpg.engine.world import MoveEvent, unlock
-from krpg.entity.inventory import EquipEvent, PickupEvent, UnequipEvent
+from krpg.engine.npc import Npc, TalkNpc, introduce
+from krpg.engine.world import Location, MoveEvent, unlock
+from krpg.entity.inventory import EquipEvent, Item, PickupEvent, UnequipEvent
 from krpg.events import Event, listener
-from krpg.events_middleware import GameEvent, HasGame
+from krpg.events_middleware import GameEvent
 from krpg.saves import Savable
 from krpg.utils import Nameable
 
 if TYPE_CHECKING:
+    from krpg.engine.linker import Linker
     from krpg.game import Game
 
 type StateUpdate[T] = tuple[T, bool] | bool | None
@@ -64,21 +65,13 @@ def unfreeze_quest(quest: Quest) -> Generator[UnfreezeEvent, Any, None]:
 class QuestCommandsExtension(Extension):
     @executer_command("quest")
     @staticmethod
-    def quest(ctx: Ctx, *args: str) -> None:
-        assert len(args) == 1, f"Expected 1 argument, got {len(args)}"
-        quest_id = args[0]
-        quest = BESTIARY.get_entity_by_id(quest_id, Quest)
-        assert quest, f"Quest {quest_id} not found"
+    def quest(ctx: Ctx, quest: Quest) -> None:
         g = ctx.game
         g.commands.execute(start_quest(g.quest_manager, quest))
 
     @executer_command("complete")
     @staticmethod
-    def complete(ctx: Ctx, *args: str) -> None:
-        assert len(args) == 1, f"Expected 1 argument, got {len(args)}"
-        quest_id = args[0]
-        quest = BESTIARY.get_entity_by_id(quest_id, Quest)
-        assert quest, f"Quest {quest_id} not found"
+    def complete(ctx: Ctx, quest: Quest) -> None:
         g = ctx.game
         g.commands.execute(unfreeze_quest(quest))
 
@@ -97,11 +90,18 @@ class QuestPredicate(Predicate):
             case _:
                 raise ValueError(f"Unknown arguments: {args}")
 
+    def link(self, linker: Linker, *args: Any) -> tuple[Any, ...]:
+        quest_id, *rest = args
+        return linker.resolve(quest_id, Quest), *rest
+
+    def version(self, game: Game) -> int:
+        return game.quest_manager.revision
+
     @staticmethod
-    def eval(game: Game, quest_id: str, cond: str, *args: Any) -> bool:
-        quest = BESTIARY.get_entity_by_id(quest_id, Quest)
-        if not quest:
-            raise ValueError(f"Quest {quest_id} not found")
+    def eval(game: Game, quest: Quest | str, cond: str, *args: Any) -> bool:
+        if isinstance(quest, str):
+            # Scripts that were not linked pass the quest id
+            quest = game.bestiary.strict_get_entity_by_id(quest, Quest)
         match cond, args:
             case "stage", [stage_id]:
                 state = game.quest_manager.get_state(quest)
@@ -149,11 +149,9 @@ class QuestActions(ActionManager):
 
 
 @component
-@listener(Event)
-def test(e: Event):
-    if not isinstance(e, HasGame):  # TODO: Rewrite to GameEvent listen
-        return
-    e.game.quest_manager.check_quests(e)
+@listener(GameEvent, batch=True)
+def test(events: list[GameEvent]):
+    events[0].game.quest_manager.check_quests(events)
 
 
 class Reward:
@@ -161,11 +159,17 @@ class Reward:
     def run(self, game: Game) -> Command[...]:
         raise NotImplementedError
 
+    def link(self, linker: Linker) -> None:
+        pass
+
 
 @attr.s(auto_attribs=True)
 class Objective(ABC, Savable):
     description: str
 
+    def link(self, linker: Linker) -> None:
+        pass
+
     def serialize(self) -> Any:
         return get_objective_name(self), self.__dict__
 
@@ -214,19 +218,19 @@ class ObjectiveStatus(Savable):
             self.state = state
         return self
 
-    def __attrs_post_init__(self):
-        self.completed = False
-
-    def check(self, event: Event) -> None:
+    def check(self, event: Event) -> bool:
+        """Returns True if completion of the objective changed"""
         res = self.objective.check(event, self.state, self.completed)
         if res is None:
-            return
+            return False
+        was_completed = self.completed
         if isinstance(res, tuple):
             state, completed = res
             self.state = state
             self.completed = completed
         else:
             self.completed = res
+        return self.completed != was_completed
 
     @property
     def progress(self) -> str:
@@ -242,7 +246,7 @@ class Quest(Nameable, Savable):
 
     @classmethod
     def deserialize(cls, data: str) -> Quest:
-        q = BESTIARY.get_entity_by_id(data, Quest)
+        q = get_bestiary().get_entity_by_id(data, Quest)
         if not q:
             raise ValueError(f"Quest {data} not found")
         return q
@@ -269,6 +273,10 @@ class QuestState(Savable):
             stage_index=data["stage_index"],
             objectives=[ObjectiveStatus.deserialize(o) for o in data["objectives"]],
         )
+        # The quest state is not saved as the state of its objectives, bind it back
+        for status, status_data in zip(self.objectives, data["objectives"]):
+            if "state" not in status_data:
+                status.state = self
         return self
 
     @property
@@ -288,27 +296,57 @@ class QuestState(Savable):
             self.stage_index += 1
             self.objectives = [o.create(self) for o in self.stage_data.objectives]
 
-    def check_stage(self, event: Event) -> None:
-        if self.ignore_events:
+    def refresh(self) -> None:
+        """Bind objectives to the reloaded quest, progress of unchanged objectives is kept"""
+        if not self.quest.stages:
+            self.objectives = []
             return
-        if not isinstance(event, HasGame):
+        self.stage_index = min(self.stage_index, len(self.quest.stages) - 1)
+        old = self.objectives
+        self.objectives = []
+        for obj in self.stage_data.objectives:
+            status = next((o for o in old if o.objective == obj), None)
+            if status:
+                status.objective = obj
+                old.remove(status)
+            else:
+                status = obj.create(self)
+            self.objectives.append(status)
+
+    def check_stage(self, event: Event) -> bool:
+        """Returns True if the stage or completion of objectives changed"""
+        if self.ignore_events:
+            return False
+        if not isinstance(event, GameEvent):
             raise ValueError("Event must have game")
+        manager = event.game.quest_manager
+        changed = False
         for o in self.objectives:
-            o.check(event)
+            changed |= o.check(event)
+        if changed:
+            # Reward scripts may check this quest, memoized results are outdated already
+            manager.revision += 1
         if all(i.completed for i in self.objectives):
             self.ignore_events = True
             for r in self.stage_data.rewards:
                 event.game.commands.execute(run_reward(event.game, r))
             self.next_stage()
             self.ignore_events = False
+            manager.revision += 1
+            changed = True
+        return changed
 
     def __attrs_post_init__(self) -> None:
-        self.next_stage()
+        # Started quests enter the first stage, loaded ones keep their stage and objectives
+        if self.stage_index < 0:
+            self.next_stage()
 
 
 @attr.s(auto_attribs=True)
 class QuestManager(Savable):
     quests: list[QuestState] = attr.ib(factory=lambda: [])
+    # Changed with quest states, memoized quest predicates are checked against it
+    revision: int = attr.ib(default=0, init=False, eq=False, repr=False)
 
     def serialize(self) -> dict[str, Any]:
         return {"quests": [q.serialize() for q in self.quests]}
@@ -329,10 +367,20 @@ class QuestManager(Savable):
 
     def start(self, quest: Quest) -> None:
         self.quests.append(QuestState(quest=quest))
+        self.revision += 1
 
-    def check_quests(self, event: Event):
-        for q in self.active:
-            q.check_stage(event)
+    def refresh(self) -> None:
+        bestiary = get_bestiary()
+        self.quests = [q for q in self.quests if q.quest.id in bestiary]
+        for q in self.quests:
+            q.refresh()
+        self.revision += 1
+
+    def check_quests(self, events: Iterable[Event]):
+        # Quest states bump the revision themselves, before rewards run
+        for event in events:
+            for q in self.active:
+                q.check_stage(event)
 
     def get_state(self, quest: Quest) -> QuestState | None:
         for q in self.quests:
@@ -382,6 +430,9 @@ class PickupObjective(Objective):
     item_id: str
     count: int = attr.ib(converter=int)
 
+    def link(self, linker: Linker) -> None:
+        linker.check(self.item_id, Item)
+
     def create(self, state: QuestState) -> ObjectiveStatus:
         return ObjectiveStatus(self, 0)
 
@@ -402,6 +453,9 @@ class PickupObjective(Objective):
 class WearObjective(Objective):
     item_id: str
 
+    def link(self, linker: Linker) -> None:
+        linker.check(self.item_id, Item)
+
     def check(self, event: Event, state: Any, completed: bool) -> StateUpdate[None]:
         if isinstance(event, EquipEvent) and not completed:
             return event.item.id == self.item_id
@@ -414,6 +468,9 @@ class WearObjective(Objective):
 class VisitObjective(Objective):
     loc_id: str
 
+    def link(self, linker: Linker) -> None:
+        linker.check(self.loc_id, Location)
+
     def check(self, event: Event, state: int, completed: bool) -> StateUpdate[None]:
         if isinstance(event, MoveEvent):
             return event.new_loc.location.id == self.loc_id
@@ -424,6 +481,9 @@ class VisitObjective(Objective):
 class TalkObjective(Objective):
     npc_id: str
 
+    def link(self, linker: Linker) -> None:
+        linker.check(self.npc_id, Npc)
+
     def check(self, event: Event, state: int, completed: bool) -> StateUpdate[None]:
         if isinstance(event, TalkNpc):
             return event.npc.npc.id == self.npc_id
@@ -441,9 +501,13 @@ class FreezeObjective(Objective):
 @attr.s(auto_attribs=True)
 class UnlockReward(Reward):
     loc_id: str
+    location: Location = attr.ib(init=False, default=None, repr=False)
+
+    def link(self, linker: Linker) -> None:
+        self.location = linker.resolve(self.loc_id, Location)
 
     def run(self, game: Game) -> Command[...]:
-        loc = game.world.get_location_by_id(self.loc_id)
+        loc = game.world.get_location_state(self.location)
         assert loc, f"{self.loc_id} doesnt exist"
         return unlock(loc)
 
@@ -452,11 +516,13 @@ class UnlockReward(Reward):
 @attr.s(auto_attribs=True)
 class ScriptReward(Reward):
     scenario_id: str
+    scenario: NamedScript = attr.ib(init=False, default=None, repr=False)
+
+    def link(self, linker: Linker) -> None:
+        self.scenario = linker.resolve(self.scenario_id, NamedScript)
 
     def run(self, game: Game) -> Command[...]:
-        sc = BESTIARY.get_entity_by_id(self.scenario_id, NamedScript)
-        assert sc, f"{self.scenario_id} doesnt exist"
-        return run_scenario(game.executer, sc)
+        return run_scenario(game.executer, self.scenario)
 
 
 @reward("INTRODUCE")
@@ -464,6 +530,9 @@ class ScriptReward(Reward):
 class IntroduceReward(Reward):
     npc_id: str
 
+    def link(self, linker: Linker) -> None:
+        linker.check(self.npc_id, Npc)
+
     def run(self, game: Game) -> Command[...]:
         npc = game.npc_manager.npcs[self.npc_id]
         assert npc, f"{self.npc_id} doesnt exist"
@@ -474,8 +543,10 @@ class IntroduceReward(Reward):
 @attr.s(auto_attribs=True)
 class QuestReward(Reward):
     quest_id: str
+    quest: Quest = attr.ib(init=False, default=None, repr=False)
+
+    def link(self, linker: Linker) -> None:
+        self.quest = linker.resolve(self.quest_id, Quest)
 
     def run(self, game: Game) -> Command[...]:
-        q = BESTIARY.get_entity_by_id(self.quest_id, Quest)
-        assert q, f"{self.quest_id} doesnt exist"
-        return start_quest(game.quest_manager, q)
+        return start_quest(game.quest_manager, self.quest)
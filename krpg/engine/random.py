@@ -11,13 +11,20 @@ from krpg.saves import Savable
 
 
 class RandomManager(Savable):
+    """Game random, `state` counts draws from the generator
+
+    The generator state is saved with the game, so a loaded or replayed game
+    continues the same sequence. The draw count lets the journal detect a
+    replay that diverged.
+    """
+
     def __init__(self):
         self.seed = int(time.time() * 1e6)
         self.rnd = random.Random(self.seed)
         self.state = 0
 
     def serialize(self) -> dict[str, Any]:
-        return {"seed": self.seed, "state": self.state}
+        return {"seed": self.seed, "state": self.state, "generator": self.rnd.getstate()}
 
     @classmethod
     def deserialize(cls, data: dict[str, Any]) -> RandomManager:
@@ -25,6 +32,10 @@ class RandomManager(Savable):
         self.seed = data["seed"]
         self.state = data["state"]
         self.rnd = random.Random(self.seed)
+        if generator := data.get("generator"):
+            # Saves keep the tuples of getstate() as lists
+            version, internal, gauss = generator
+            self.rnd.setstate((version, tuple(internal), gauss))
         return self
 
     def set_seed(self, seed: int):
@@ -37,7 +48,6 @@ class RandomManager(Savable):
         return self.rnd.random()
 
     def randint(self, a: int, b: int) -> int:
-        self.state += 1
         # можно использовать rnd.randint(a, b), но с твоей механикой вызова random() так безопаснее
         return a + math.floor(self.random() * (b - a + 1))
 
@@ -61,7 +71,6 @@ class RandomManager(Savable):
             r = self.random() * total
             idx = bisect.bisect(cum_weights, r)
             result.append(options[idx])
-        self.state += k
         return result
 
     def __repr__(self):
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import glob
+import os
+import zlib
+from typing import TYPE_CHECKING, Any
+
+import attr
+
+from krpg import ROOT_DIR
+from krpg.bestiary import Bestiary
+from krpg.console import KrpgConsole
+from krpg.engine.builder import BASE_FOLDER, STEPS, parse_pack, wrap_log
+from krpg.engine.cache import copy_states
+from krpg.engine.linker import link
+from krpg.parser import Section
+
+if TYPE_CHECKING:
+    from krpg.game import Game
+
+# Top-level sections that can be rebuilt in a running game
+RELOADABLE = ["scenarios", "items", "npcs", "locations", "quests"]
+
+# Sections that resolve ids from other sections while linking
+DEPENDENTS: dict[str, list[str]] = {
+    "scenarios": ["quests"],
+    "items": ["locations"],
+    "npcs": ["locations", "quests"],
+    "locations": ["quests"],
+    "quests": [],
+}
+
+
+def section_shape(item: Section | Any) -> tuple[Any, ...]:
+    children = [section_shape(child) for child in item.children] if isinstance(item, Section) else None
+    return item.content, children
+
+
+def section_digest(section: Section | Any | None) -> int | None:
+    # Positions are not part of the digest, moving a section in the file is not a change
+    if section is None:
+        return None
+    return zlib.crc32(repr(section_shape(section)).encode())
+
+
+def with_dependents(names: list[str]) -> list[str]:
+    result = set(names)
+    queue = list(names)
+    while queue:
+        for dependent in DEPENDENTS[queue.pop()]:
+            if dependent not in result:
+                result.add(dependent)
+                queue.append(dependent)
+    return [name for name in RELOADABLE if name in result]
+
+
+def section_ids(root: Section) -> dict[str, set[str]]:
+    """Ids of the entities defined by each reloadable section"""
+    ids: dict[str, set[str]] = {}
+    for name in RELOADABLE:
+        section = root.get(name, command=False)
+        ids[name] = {child.name for child in section.all(command=False) if child.name} if isinstance(section, Section) else set()
+    return ids
+
+
+def patch_bestiary(bestiary: Bestiary, console: KrpgConsole, root: Section, names: list[str], removed: set[str] = set()) -> list[Any]:
+    """Rebuild sections and patch entities of the live bestiary in place
+
+    Sections are built into a staging bestiary that holds the rest of the
+    live entities, so nothing is changed if building fails. Existing
+    entities keep their identity, game states and other entities that
+    point to them see the new data. Removed entities are dropped after the
+    rest is patched.
+    """
+    ids = section_ids(root)
+    defined = set().union(*(ids[name] for name in names))
+    staging = Bestiary([entity for entity in bestiary.data if entity.id not in defined | removed])
+    seeded = len(staging.data)
+    for name, step in STEPS:
+        if name in names and (section := root.get(name, command=False)):
+            assert isinstance(section, Section)
+            wrap_log(staging, console, section, name, step)
+    built = staging.data[seeded:]
+    link(staging, console, root, built)
+
+    targets = {entity.id: entity for entity in bestiary.data}
+    for entity in built:
+        live = targets.get(entity.id)
+        if live is not None and type(live) is not type(entity):
+            raise ValueError(f"Entity {entity.id} changed type: {type(live).__name__} -> {type(entity).__name__}")
+        if live is None:
+            targets[entity.id] = object.__new__(type(entity))
+
+    states = copy_states(staging, built, targets)
+    for entity, state in zip(built, states):
+        target = targets[entity.id]
+        target.__dict__.clear()
+        target.__dict__.update(state)
+        if entity.id not in bestiary:
+            bestiary.add(target)
+    for entity_id in removed - defined:
+        if entity_id in bestiary:
+            bestiary.remove(entity_id)
+    return built
+
+
+def patch_game(game: Game) -> None:
+    game.world.refresh()
+    game.npc_manager.refresh()
+    game.quest_manager.refresh()
+    game.executer.results.clear()
+
+
+@attr.s(auto_attribs=True)
+class ContentWatcher:
+    """Rebuilds changed content into the bestiary of one session, it must not be shared"""
+
+    bestiary: Bestiary
+    console: KrpgConsole
+    folder: str = f"{ROOT_DIR}/{BASE_FOLDER}"
+    digests: dict[str, int | None] = attr.ib(factory=lambda: {}, repr=False)
+    mtimes: dict[str, int] = attr.ib(factory=lambda: {}, repr=False)
+    ids: dict[str, set[str]] = attr.ib(factory=lambda: {}, repr=False)
+
+    def __attrs_post_init__(self) -> None:
+        root, sources = parse_pack(self.folder)
+        self.digests = self.section_digests(root)
+        self.mtimes = self.stamp(sources)
+        self.ids = section_ids(root)
+
+    def section_digests(self, root: Section) -> dict[str, int | None]:
+        return {name: section_digest(root.get(name, command=False)) for name in RELOADABLE}
+
+    def stamp(self, sources: list[str]) -> dict[str, int]:
+        paths = set(sources) | {os.path.abspath(p) for p in glob.glob(os.path.join(self.folder, "*.krpg"))}
+        return {path: os.stat(path).st_mtime_ns if os.path.exists(path) else 0 for path in paths}
+
+    def is_modified(self) -> bool:
+        return self.stamp(list(self.mtimes)) != self.mtimes
+
+    def poll(self, game: Game | None = None, force: bool = False) -> list[str]:
+        """Rebuild changed sections and patch the game
+
+        Returns names of rebuilt sections. Digests are updated only after a
+        successful patch, so a broken file is retried after the next save.
+        """
+        if not force and not self.is_modified():
+            return []
+        root, sources = parse_pack(self.folder)
+        self.mtimes = self.stamp(sources)
+        digests = self.section_digests(root)
+        changed = [name for name in RELOADABLE if digests[name] != self.digests.get(name)]
+        if not changed:
+            return []
+        names = with_dependents(changed)
+        ids = section_ids(root)
+        removed = set().union(*(self.ids[name] - ids[name] for name in names))
+        if game is not None and game.world.current_location.location.id in removed:
+            raise ValueError(f"Current location {game.world.current_location.location.id} is removed")
+        self.console.log.debug(f"[Reload] Changed {changed}, rebuilding {names}, removed {sorted(removed)}")
+        patch_bestiary(self.bestiary, self.console, root, names, removed)
+        if game is not None:
+            patch_game(game)
+        self.digests, self.ids = digests, ids
+        return names
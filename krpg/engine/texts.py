@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import ast
+from typing import TYPE_CHECKING, Any
+
+from rich.errors import MarkupError
+from rich.text import Text
+
+from krpg.engine.expressions import Expression, ExpressionError, compile_expression
+
+if TYPE_CHECKING:
+    from krpg.game import Game
+
+
+class StaticText:
+    """Text without placeholders, markup is parsed once and shared by all sessions"""
+
+    def __init__(self, markup: str) -> None:
+        self.markup = markup
+        try:
+            self.text = Text.from_markup(markup)
+        except MarkupError as e:
+            raise ValueError(f"Invalid markup: {e}") from None
+
+    def render(self, game: Game, env: dict[str, Any]) -> Text:
+        return self.text
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return StaticText, (self.markup,)
+
+    def __repr__(self) -> str:
+        return f"<StaticText {self.markup!r}>"
+
+
+class TemplateText:
+    """Text with placeholders, markup is parsed on display
+
+    Placeholders the expression compiler supports are compiled into
+    closures, other templates keep full python and are evaluated as before.
+    """
+
+    def __init__(self, style: str, source: str, expression: Expression | None = None) -> None:
+        self.style = style
+        self.source = source
+        self.expression = expression
+
+    def render(self, game: Game, env: dict[str, Any]) -> str:
+        if self.expression is None:
+            return self.style + game.executer.process_text(self.source)
+        return self.style + self.expression(game, env)
+
+    def __repr__(self) -> str:
+        return f"<TemplateText {self.source!r}>"
+
+
+type ScriptText = StaticText | TemplateText
+
+
+def compile_text(text: str, style: str = "") -> ScriptText:
+    """Classify text as static or templated, same way as Executer.process_text reads it"""
+    source = f"f'''{text}'''"
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid text {text!r}: {e.msg}") from None
+    assert isinstance(tree.body, ast.JoinedStr)
+    values = tree.body.values
+    if all(isinstance(value, ast.Constant) for value in values):
+        # Escapes and {{ }} are already decoded by the parser
+        return StaticText(style + "".join(str(value.value) for value in values if isinstance(value, ast.Constant)))
+    try:
+        return TemplateText(style, text, compile_expression(source))
+    except ExpressionError:
+        # Attribute chains, methods and other python the compiler does not allow
+        return TemplateText(style, text)
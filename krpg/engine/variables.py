@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import sys
+from typing import Any, Iterable
+
+# Types that survive a save, containers are not checked deeper
+SAVABLE_TYPES = (type(None), bool, int, float, str, list, tuple, dict)
+
+
+def is_temporary(name: str) -> bool:
+    return name.startswith("_")
+
+
+class VariableStore(dict[str, Any]):
+    """Executer variables with a journal of writes since the last checkpoint
+
+    Names starting with `_` are temporary: they are not journaled, not
+    saved and removed by `clear_temporary`. Other values must be savable,
+    names and string values are interned. Changes inside lists and dicts
+    are not journaled, assign the value again to record them.
+    """
+
+    def __init__(self, data: dict[str, Any] | None = None) -> None:
+        super().__init__()
+        self.written: set[str] = set()
+        self.deleted: set[str] = set()
+        self.temporary: set[str] = set()
+        if data:
+            self.update(data)
+        self.checkpoint()
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        name = sys.intern(name)
+        if is_temporary(name):
+            self.temporary.add(name)
+        else:
+            if not isinstance(value, SAVABLE_TYPES):
+                raise TypeError(f"Variable {name} can't be saved: {type(value).__name__}")
+            if type(value) is str:
+                value = sys.intern(value)
+            self.written.add(name)
+            self.deleted.discard(name)
+        super().__setitem__(name, value)
+
+    def __delitem__(self, name: str) -> None:
+        super().__delitem__(name)
+        if is_temporary(name):
+            self.temporary.discard(name)
+        else:
+            self.written.discard(name)
+            self.deleted.add(name)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:  # type: ignore[override]
+        for name, value in dict(*args, **kwargs).items():
+            self[name] = value
+
+    def setdefault(self, name: str, default: Any = None) -> Any:
+        if name not in self:
+            self[name] = default
+        return self[name]
+
+    def pop(self, name: str, *default: Any) -> Any:  # type: ignore[override]
+        if name not in self:
+            if default:
+                return default[0]
+            raise KeyError(name)
+        value = self[name]
+        del self[name]
+        return value
+
+    def popitem(self) -> tuple[str, Any]:
+        name = next(reversed(self))
+        return name, self.pop(name)
+
+    def clear(self) -> None:
+        self.remove(list(self))
+
+    def remove(self, names: Iterable[str]) -> None:
+        for name in names:
+            del self[name]
+
+    def clear_temporary(self) -> None:
+        self.remove(list(self.temporary))
+
+    def checkpoint(self) -> None:
+        self.written.clear()
+        self.deleted.clear()
+
+    def delta(self) -> dict[str, Any]:
+        """Variables written and deleted since the last checkpoint"""
+        return {"set": {name: self[name] for name in self.written}, "deleted": sorted(self.deleted)}
+
+    def apply(self, delta: dict[str, Any]) -> None:
+        self.remove(name for name in delta["deleted"] if name in self)
+        self.update(delta["set"])
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return VariableStore, (dict(self),)
@@ -7,14 +7,14 @@ from rich.panel import Panel
 from rich.tree import Tree
 
 from krpg.actions import Action, ActionCategory, ActionManager, action
-from krpg.bestiary import BESTIARY
+from krpg.bestiary import get_bestiary
 from krpg.commands import command
 from krpg.components import component
-from krpg.engine.executer import Ctx, Extension, NamedScript, executer_command
+from krpg.engine.executer import Ctx, Extension, InputRequest, NamedScript, executer_command
 from krpg.engine.npc import Npc
 from krpg.entity.inventory import Slot
 from krpg.events_middleware import GameEvent
-from krpg.parser import Command
+from krpg.parser import Node
 from krpg.saves import Savable
 from krpg.utils import Nameable
 
@@ -73,45 +73,39 @@ class WorldActions(ActionManager):
 class NpcUtils(Extension):  # TODO: move to npc
     @executer_command("evolve")
     @staticmethod
-    def evolve(ctx: Ctx, npc_id: str) -> None:
-        game = ctx.game
-        npc = game.npc_manager.npcs[npc_id]
-        assert npc, f"Where is {npc_id}"
-        npc.stage += 1
+    def evolve(ctx: Ctx, npc: Npc) -> None:
+        ctx.game.npc_manager.npcs[npc.id].stage += 1
 
     @executer_command("goto")
     @staticmethod
-    def goto(ctx: Ctx, npc_id: str, loc_id: str) -> None:
+    def goto(ctx: Ctx, npc: Npc, location: Location) -> None:
         game = ctx.game
-        npc = ctx.game.npc_manager.npcs[npc_id]
-        assert npc, f"Where is {npc_id}"
         for loc in game.world.locations:
-            if npc.npc in loc.npcs:
-                loc.npcs.remove(npc.npc)
+            if npc in loc.npcs:
+                loc.npcs.remove(npc)
                 break
-        # TODO: Move locations to bestiary?
-        loc = game.world.get_location_by_id(loc_id)
-        assert loc, f"Where is {loc_id}"
-        loc.npcs.append(npc.npc)
+        loc = game.world.get_location_state(location)
+        assert loc, f"Where is {location.id}"
+        loc.npcs.append(npc)
 
     @executer_command("unlock")
     @staticmethod
-    def unlock(ctx: Ctx, loc_id: str) -> None:
-        loc = ctx.game.world.get_location_by_id(loc_id)
+    def unlock(ctx: Ctx, location: Location) -> None:
+        loc = ctx.game.world.get_location_state(location)
         if not loc:
-            raise ValueError(f"Location {loc_id} not found")
+            raise ValueError(f"Location {location.id} not found")
         ctx.game.commands.execute(unlock(loc))
 
-    @executer_command("multiple")
+    @executer_command("multiple", script=False)
     @staticmethod  # TODO: move to std
-    def multiple(ctx: Ctx, title: str, min: str, max: str, var_name: str, children: list[Command]):
-        minv, maxv = int(min), int(max)
+    def multiple(ctx: Ctx, title: str, minv: int, maxv: int, var_name: str, children: tuple[Node, ...]):
         completer: dict[str, int] = {}
         for opt in children:
             k, v = opt.args
             v = ctx.executer.process_text(v)
             completer[v] = int(k)
-        res = ctx.game.console.multiple(title, completer, minv, maxv)
+        request = InputRequest(title, completer, minv, maxv)
+        res = ctx.ask(request, lambda: ctx.game.console.multiple(title, completer, minv, maxv))
         ctx.executer.env[var_name] = res
 
 
@@ -159,11 +153,12 @@ class LocationState(Savable):
 
     @classmethod
     def deserialize(cls, data: Any, *args: Any, **kwargs: Any) -> LocationState:
-        location = BESTIARY.strict_get_entity_by_id(data["location"], Location)
+        bestiary = get_bestiary()
+        location = bestiary.strict_get_entity_by_id(data["location"], Location)
         is_locked = data["is_locked"]
         stage = data["stage"]
         items = [Slot.deserialize(item) for item in data["items"]]
-        npcs = [BESTIARY.strict_get_entity_by_id(npc_id, Npc) for npc_id in data["npcs"]]
+        npcs = [bestiary.strict_get_entity_by_id(npc_id, Npc) for npc_id in data["npcs"]]
         # TODO: Use strict_get_entity_by_id in more places
         return cls(location=location, is_locked=is_locked, stage=stage, items=items, npcs=npcs)
 
@@ -176,7 +171,8 @@ class LocationState(Savable):
     @classmethod
     def from_location(cls, location: Location) -> LocationState:
         self = cls(location=location)
-        self.npcs = location.init_npcs
+        # Location is shared by all sessions of the content
+        self.npcs = location.init_npcs.copy()
         # TODO: Optimize copying?
         self.items = [Slot(slot.type, slot.item, slot.count) for slot in location.init_items]
         self.is_locked = location.locked
@@ -199,7 +195,7 @@ class World(Savable):
     current_location: LocationState = attr.ib(init=False, repr=lambda x: repr(x.id) if x else "None")
 
     def __attrs_post_init__(self):
-        locations = BESTIARY.get_all(Location)
+        locations = get_bestiary().get_all(Location)
         self.locations = [LocationState.from_location(loc) for loc in locations]
         start_location = None
         for loc in self.locations:
@@ -216,6 +212,17 @@ class World(Savable):
     def serialize(self) -> dict[str, Any]:
         return {"locations": [loc.serialize() for loc in self.locations], "current_location": self.current_location.location.id}
 
+    def refresh(self) -> None:
+        # Locations are patched in place on reload, only new ones need a state
+        bestiary = get_bestiary()
+        self.locations = [state for state in self.locations if state.location.id in bestiary]
+        for location in bestiary.get_all(Location):
+            state = self.get_location_state(location)
+            if not state:
+                self.locations.append(LocationState.from_location(location))
+            else:
+                state.stage = min(state.stage, max(len(location.stages) - 1, 0))
+
     @classmethod
     def deserialize(cls, data: dict[str, Any]) -> World:
         instance = cls()
@@ -242,7 +249,7 @@ class World(Savable):
 
     def get_location_state(self, location: Location) -> LocationState | None:
         for loc_state in self.locations:
-            if loc_state.location == location:
+            if loc_state.location is location:
                 return loc_state
         return None
 
@@ -6,7 +6,7 @@ from typing import Any, Callable, TypeVar
 import attr
 from attr import field
 
-from krpg.bestiary import BESTIARY
+from krpg.bestiary import get_bestiary
 from krpg.entity.enums import Attribute, Body, EntityScales, ModifierType, TargetType
 from krpg.saves import Savable
 from krpg.utils import DEFAULT_DESCRIPTION, Nameable
@@ -23,7 +23,7 @@ class EffectState(Savable):
     @classmethod
     def deserialize(cls, data: Any, *args: Any, **kwargs: Any) -> EffectState:
         instance = cls.__new__(cls)
-        instance.effect = BESTIARY.strict_get_entity_by_id(data[0], Effect)
+        instance.effect = get_bestiary().strict_get_entity_by_id(data[0], Effect)
         instance.time = data[1]
         return instance
 
@@ -5,13 +5,14 @@ from typing import Any, Generator, Self
 import attr
 from attr import field
 
-from krpg.bestiary import BESTIARY
+from krpg.bestiary import get_bestiary
 from krpg.commands import command
 from krpg.components import component
 from krpg.engine.executer import Ctx, Extension, executer_command
 from krpg.entity.effects import Effect, EffectState
 from krpg.entity.enums import ItemTag, SlotType
 from krpg.entity.skills import SkillState, SkillTree
+from krpg.events import Event
 from krpg.events_middleware import GameEvent
 from krpg.saves import Savable
 from krpg.utils import DEFAULT_DESCRIPTION, Nameable
@@ -34,6 +35,11 @@ class PickupEvent(GameEvent):
     item: Item
     count: int
 
+    def merge(self, other: Event) -> Event | None:
+        if type(other) is PickupEvent and other.item is self.item:
+            return PickupEvent(self.item, self.count + other.count)
+        return None
+
 
 @attr.s(auto_attribs=True)
 class DropEvent(GameEvent):
@@ -74,10 +80,7 @@ def drop(slot: Slot, count: int) -> Generator[DropEvent, Any, tuple[Item | None,
 class InventoryCommands(Extension):
     @executer_command("pickup")
     @staticmethod
-    def pickup(ctx: Ctx, item_id: str):
-        item = BESTIARY.get_entity_by_id(item_id, Item)
-        if not item:
-            raise ValueError(f"Item with ID {item_id} not found")
+    def pickup(ctx: Ctx, item: Item):
         remain = ctx.game.commands.execute(pickup(ctx.game.player.entity.inventory, item, 1))  # TODO: property inventory to player
         if remain:
             # ctx.game.console.print(f"[yellow]Не удалось получить все предметы. [green]{remain}[/]x[green]{item.name}[/] остались лежать тут[/]")
@@ -100,7 +103,7 @@ class Slot(Savable):
         type = SlotType.deserialize(data[0])
         item_id = data[1]
         count = data[2]
-        item = BESTIARY.get_entity_by_id(item_id, Item) if item_id else None
+        item = get_bestiary().get_entity_by_id(item_id, Item) if item_id else None
         return cls(type=type, item=item, count=count)
 
     def fill(self, item: Item, count: int) -> int:
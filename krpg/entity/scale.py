@@ -15,12 +15,18 @@ class Scale(Nameable, Savable):
     _value: float = 0.0
 
     def serialize(self) -> Any:
-        return [self.id, self.name, self.base_max_value, self.bonus]
+        return [self.id, self.name, self.base_max_value, self.bonus, self._value]
 
     @classmethod
     def deserialize(cls, data: Any, *args: Any, **kwargs: Any) -> Scale:
         # TODO: Saving name and id is not good
-        return cls(id=data[0], name=data[1], base_max_value=data[2], bonus=data[3])
+        scale = cls(id=data[0], name=data[1], base_max_value=data[2], bonus=data[3])
+        # Saves without the value start full, or empty for infinite scales
+        if len(data) > 4:
+            scale._value = data[4]
+        else:
+            scale.reset()
+        return scale
 
     @property
     def value(self) -> float:
@@ -5,7 +5,7 @@ from typing import TYPE_CHECKING, Any, Self
 import attr
 from attr import field
 
-from krpg.bestiary import BESTIARY
+from krpg.bestiary import get_bestiary
 from krpg.entity.enums import TargetType
 from krpg.saves import Savable
 from krpg.utils import DEFAULT_DESCRIPTION, Nameable, get_by_id
@@ -62,9 +62,9 @@ class SkillState(Savable):
     @classmethod
     def deserialize(cls, data: Any, *args: Any, **kwargs: Any) -> SkillState:
         instance = cls.__new__(cls)
-        instance.skill = BESTIARY.strict_get_entity_by_id(data["skill"], Skill)
+        instance.skill = get_bestiary().strict_get_entity_by_id(data["skill"], Skill)
         instance.cooldown = data["cooldown"]
-        instance.use_slot = BESTIARY.strict_get_entity_by_id(data["use_slot"], Slot) if data["use_slot"] else None
+        instance.use_slot = get_bestiary().strict_get_entity_by_id(data["use_slot"], Slot) if data["use_slot"] else None
         instance.prepare = data["prepare"]
         return instance
 
@@ -93,7 +93,7 @@ class SkillTree(Savable):
     @classmethod
     def deserialize(cls, data: Any, *args: Any, **kwargs: Any) -> SkillTree:
         instance = cls.__new__(cls)
-        instance.skills = [BESTIARY.strict_get_entity_by_id(skill_data, Skill) for skill_data in data["skills"]]
+        instance.skills = [get_bestiary().strict_get_entity_by_id(skill_data, Skill) for skill_data in data["skills"]]
         instance.learned = [SkillState.deserialize(state_data) for state_data in data["learned"]]
         instance.points = data["points"]
         instance.xp = data["xp"]
@@ -2,27 +2,49 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from collections import defaultdict
-from typing import Callable
+from enum import Enum
+from typing import TYPE_CHECKING, Callable
 
 import attr
 
+if TYPE_CHECKING:
+    from krpg.events_bus import EventBus
+    from krpg.events_metrics import EventMetrics
+
 type EventType = type[Event]
 type Callback = Callable[[Event], None]
+type BatchCallback = Callable[[list[Event]], None]
+
+
+class Delivery(Enum):
+    # Called by publish, before it returns
+    INLINE = "inline"
+    # Called when the turn ends, after the player's command
+    DEFERRED = "deferred"
+    # Called by a task of the event bus in its own thread
+    BACKGROUND = "background"
 
 
 @attr.s(auto_attribs=True)
 class Listener:
     event: EventType
-    callback: Callback
+    callback: Callback | BatchCallback
+    # Batch listeners get all matching events of a publish in one call
+    batch: bool = False
+    # Listeners with higher priority are called first
+    priority: int = 0
+    delivery: Delivery = Delivery.INLINE
 
 
 class Event:
-    pass
+    def merge(self, other: Event) -> Event | None:
+        """Event that replaces this one and the next one in a batch, None if they can't be merged"""
+        return None
 
 
-def listener(event: EventType) -> Callable[..., Listener]:
-    def decorator(callback: Callback) -> Listener:
-        return Listener(event, callback)
+def listener(event: EventType, batch: bool = False, priority: int = 0, delivery: Delivery = Delivery.INLINE) -> Callable[..., Listener]:
+    def decorator(callback: Callback | BatchCallback) -> Listener:
+        return Listener(event, callback, batch, priority, delivery)
 
     return decorator
 
@@ -37,6 +59,13 @@ class EventHandler:
     def __init__(self, *lookup: object) -> None:
         self.middlewares: list[Middleware] = []
         self.listeners: dict[EventType, list[Listener]] = defaultdict(list)
+        # Listeners of an event type and of its bases in MRO order, reset on subscribe
+        self.dispatch: dict[EventType, list[Listener]] = {}
+        self.batch_dispatch: dict[EventType, list[Listener]] = {}
+        # Created for the first deferred or background listener, without it all listeners are inline
+        self.bus: EventBus | None = None
+        # Opt-in, publishing is timed while it is set
+        self.metrics: EventMetrics | None = None
         for obj in lookup:
             self.lookup(obj)
 
@@ -44,8 +73,60 @@ class EventHandler:
         self.middlewares.append(mw)
 
     def subscribe(self, callback: Listener) -> None:
+        if callback.delivery is not Delivery.INLINE and self.bus is None:
+            from krpg.events_bus import EventBus
+
+            self.bus = EventBus()
         if callback not in self.listeners[callback.event]:
             self.listeners[callback.event].append(callback)
+            self.dispatch.clear()
+            self.batch_dispatch.clear()
+
+    def unsubscribe(self, callback: Listener) -> None:
+        listeners = self.listeners.get(callback.event)
+        if listeners and callback in listeners:
+            listeners.remove(callback)
+            self.dispatch.clear()
+            self.batch_dispatch.clear()
+
+    def dispatch_table(self, event: EventType) -> list[Listener]:
+        table = self.dispatch.get(event)
+        if table is None:
+            table = self.dispatch[event] = self.collect(event, batch=False)
+        return table
+
+    def batch_table(self, event: EventType) -> list[Listener]:
+        table = self.batch_dispatch.get(event)
+        if table is None:
+            table = self.batch_dispatch[event] = self.collect(event, batch=True)
+        return table
+
+    def collect(self, event: EventType, batch: bool) -> list[Listener]:
+        listeners = [item for base in event.__mro__ for item in self.listeners.get(base, ()) if item.batch == batch]
+        # Stable, listeners with the same priority keep the MRO order
+        return sorted(listeners, key=lambda item: -item.priority)
+
+    def set_metrics(self, metrics: EventMetrics | None) -> None:
+        self.metrics = metrics
+        if self.bus is not None:
+            self.bus.metrics = metrics
+
+    def process(self, event: Event) -> None:
+        if self.metrics is None:
+            for mw in self.middlewares:
+                mw.process(event)
+            return
+        self.metrics.publish(event)
+        for mw in self.middlewares:
+            self.metrics.middleware(mw, event)
+
+    def deliver(self, listener: Listener, payload: Event | list[Event]) -> None:
+        if listener.delivery is not Delivery.INLINE and self.bus is not None:
+            self.bus.submit(listener, payload)
+        elif self.metrics is None:
+            listener.callback(payload)  # type: ignore[arg-type]
+        else:
+            self.metrics.listener(listener.callback, payload)
 
     def lookup(self, obj: object) -> None:
         for attrib in dir(obj):
@@ -54,14 +135,37 @@ class EventHandler:
                 self.subscribe(item)
 
     def publish(self, event: Event) -> None:
-        for mw in self.middlewares:
-            mw.process(event)
-
-        for listener in self.listeners[type(event)]:
-            listener.callback(event)
-
-        for listener in self.listeners[Event]:
-            listener.callback(event)
+        self.process(event)
+
+        for listener in self.dispatch_table(type(event)):
+            self.deliver(listener, event)
+        for listener in self.batch_table(type(event)):
+            self.deliver(listener, [event])
+
+    def publish_batch(self, events: list[Event]) -> None:
+        """Publish events one by one, then call every batch listener once with its events"""
+        for event in events:
+            self.process(event)
+            for listener in self.dispatch_table(type(event)):
+                self.deliver(listener, event)
+
+        # Listeners are not hashable, grouped by identity in order of the first event
+        batches: dict[int, tuple[Listener, list[Event]]] = {}
+        for event in events:
+            for listener in self.batch_table(type(event)):
+                batches.setdefault(id(listener), (listener, []))[1].append(event)
+        for listener, batch in batches.values():
+            self.deliver(listener, batch)
+
+    def end_turn(self) -> None:
+        if self.bus is not None:
+            self.bus.end_turn()
+        if self.metrics is not None:
+            self.metrics.end_turn()
+
+    def close(self) -> None:
+        if self.bus is not None:
+            self.bus.close()
 
     def __repr__(self) -> str:
         return f"<EventHandler listeners={len(self.listeners)}>"
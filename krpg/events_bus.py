@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import threading
+from typing import TYPE_CHECKING, Any
+
+from krpg.events import Delivery, Event, Listener
+
+if TYPE_CHECKING:
+    from krpg.events_metrics import EventMetrics
+
+Payload = Event | list[Event]
+
+
+class EventBus:
+    """Delivery of events to listeners that should not slow the player's command
+
+    Deferred listeners are called on the input thread when the turn ends.
+    Background listeners get their events from a bounded queue read by a
+    task of an asyncio loop in its own thread, callbacks may be coroutines.
+    A full queue drops the new event instead of blocking the game.
+    """
+
+    def __init__(self, queue_size: int = 256) -> None:
+        self.queue_size = queue_size
+        self.deferred: list[tuple[Listener, Payload]] = []
+        self.dropped: dict[str, int] = {}
+        self.log = logging.getLogger("console")
+        self.metrics: EventMetrics | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.thread: threading.Thread | None = None
+        # Queues and tasks are only touched from the loop thread
+        self.queues: dict[int, asyncio.Queue[Payload]] = {}
+        self.tasks: list[asyncio.Task[None]] = []
+
+    def submit(self, listener: Listener, payload: Payload) -> None:
+        if listener.delivery is Delivery.DEFERRED:
+            self.deferred.append((listener, payload))
+        else:
+            self.start().call_soon_threadsafe(self.put, listener, payload)
+
+    def end_turn(self) -> None:
+        # Deferred listeners may publish more deferred events
+        while self.deferred:
+            pending = sorted(self.deferred, key=lambda item: -item[0].priority)
+            self.deferred = []
+            for listener, payload in pending:
+                self.call(listener, payload)
+
+    def call(self, listener: Listener, payload: Payload) -> Any:
+        if self.metrics is None:
+            return listener.callback(payload)  # type: ignore[arg-type]
+        return self.metrics.listener(listener.callback, payload)
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self.loop.run_forever, name="krpg-events", daemon=True)
+            self.thread.start()
+        return self.loop
+
+    def put(self, listener: Listener, payload: Payload) -> None:
+        queue = self.queues.get(id(listener))
+        if queue is None:
+            queue = self.queues[id(listener)] = asyncio.Queue(self.queue_size)
+            self.tasks.append(asyncio.get_running_loop().create_task(self.consume(listener, queue)))
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            name = getattr(listener.callback, "__qualname__", repr(listener.callback))
+            self.dropped[name] = self.dropped.get(name, 0) + 1
+
+    async def consume(self, listener: Listener, queue: asyncio.Queue[Payload]) -> None:
+        while True:
+            payload = await queue.get()
+            try:
+                if self.metrics is not None:
+                    await self.metrics.background_listener(listener.callback, payload)
+                else:
+                    # Callbacks are typed to return None, coroutine listeners are awaited too
+                    result: Any = listener.callback(payload)  # type: ignore[arg-type]
+                    if inspect.isawaitable(result):
+                        await result
+            except Exception:  # A background listener must not stop the others
+                self.log.exception(f"Listener {listener.callback} failed on {payload}")
+            finally:
+                queue.task_done()
+
+    async def drain(self) -> None:
+        for queue in list(self.queues.values()):
+            await queue.join()
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Wait until background listeners took every submitted event"""
+        if self.loop is None:
+            return
+        # The barrier runs after the puts already scheduled by submit
+        asyncio.run_coroutine_threadsafe(self.drain(), self.loop).result(timeout)
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        self.end_turn()
+        if self.loop is None or self.thread is None:
+            return
+        self.flush(timeout)
+        asyncio.run_coroutine_threadsafe(self.stop(), self.loop).result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        self.loop.close()
+        self.loop = self.thread = None
+        self.queues.clear()
+        self.tasks.clear()
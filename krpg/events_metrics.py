@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import inspect
+import json
+import threading
+import time
+from typing import Any, Callable
+
+import attr
+
+# Values below 2 ** SUB_BITS get a bucket each, above it every power of two
+# is split in 2 ** (SUB_BITS - 1) buckets, a bucket is at most 1/8 wide
+SUB_BITS = 4
+HALF = 1 << (SUB_BITS - 1)
+
+
+def bucket_index(value: int) -> int:
+    if value < 1 << SUB_BITS:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BITS
+    return HALF * shift + (value >> shift)
+
+
+def bucket_bounds(index: int) -> tuple[int, int]:
+    """Lowest value of the bucket and the lowest value of the next one"""
+    if index < 1 << SUB_BITS:
+        return index, index + 1
+    shift = index // HALF - 1
+    low = (index % HALF + HALF) << shift
+    return low, low + (1 << shift)
+
+
+@attr.s(auto_attribs=True)
+class Histogram:
+    """Latencies in nanoseconds counted in fixed log-linear buckets, like HdrHistogram"""
+
+    buckets: dict[int, int] = attr.ib(factory=lambda: {}, repr=False)
+    count: int = 0
+    total: int = 0
+    max: int = 0
+
+    def record(self, value: int) -> None:
+        index = bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> int:
+        """Upper bound of the bucket with the q-th percentile, q from 0 to 100"""
+        if not self.count:
+            return 0
+        rank = q / 100 * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(bucket_bounds(index)[1] - 1, self.max)
+        return self.max
+
+    def serialize(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ns": self.total,
+            "max_ns": self.max,
+            "p50_ns": self.percentile(50),
+            "p90_ns": self.percentile(90),
+            "p99_ns": self.percentile(99),
+            # Lowest value of the bucket to the number of values in it
+            "buckets": {str(bucket_bounds(index)[0]): count for index, count in sorted(self.buckets.items())},
+        }
+
+
+def listener_name(callback: Callable[..., Any]) -> str:
+    return f"{callback.__module__}.{callback.__qualname__}"
+
+
+@attr.s(auto_attribs=True)
+class EventMetrics:
+    """Publish counts by event type and the latency of middlewares and listeners
+
+    Set on the event handler while enabled, publishing is not timed
+    otherwise. Background listeners are timed in the thread of the bus,
+    coroutine callbacks until they finish.
+    """
+
+    published: dict[str, int] = attr.ib(factory=lambda: {})
+    middlewares: dict[str, Histogram] = attr.ib(factory=lambda: {})
+    listeners: dict[str, Histogram] = attr.ib(factory=lambda: {})
+    turns: int = 0
+    clock: Callable[[], int] = attr.ib(default=time.perf_counter_ns, repr=False)
+    _lock: threading.Lock = attr.ib(factory=threading.Lock, init=False, repr=False)
+
+    def publish(self, event: object) -> None:
+        name = type(event).__qualname__
+        self.published[name] = self.published.get(name, 0) + 1
+
+    def record(self, stats: dict[str, Histogram], name: str, elapsed: int) -> None:
+        with self._lock:
+            histogram = stats.get(name)
+            if histogram is None:
+                histogram = stats[name] = Histogram()
+            histogram.record(elapsed)
+
+    def call(self, stats: dict[str, Histogram], name: str, func: Callable[[Any], Any], arg: Any) -> Any:
+        start = self.clock()
+        try:
+            return func(arg)
+        finally:
+            self.record(stats, name, self.clock() - start)
+
+    def middleware(self, mw: object, event: object) -> None:
+        self.call(self.middlewares, type(mw).__qualname__, mw.process, event)  # type: ignore[attr-defined]
+
+    def listener(self, callback: Callable[[Any], Any], payload: Any) -> Any:
+        return self.call(self.listeners, listener_name(callback), callback, payload)
+
+    async def background_listener(self, callback: Callable[[Any], Any], payload: Any) -> None:
+        """Time a background listener, a coroutine is timed until it finishes"""
+        start = self.clock()
+        try:
+            result = callback(payload)
+            if inspect.isawaitable(result):
+                await result
+        finally:
+            self.record(self.listeners, listener_name(callback), self.clock() - start)
+
+    def end_turn(self) -> None:
+        self.turns += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.published.clear()
+            self.middlewares.clear()
+            self.listeners.clear()
+            self.turns = 0
+
+    def serialize(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "published": dict(self.published),
+                "middlewares": {name: stat.serialize() for name, stat in self.middlewares.items()},
+                "listeners": {name: stat.serialize() for name, stat in self.listeners.items()},
+            }
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.serialize(), f, indent=4, ensure_ascii=False)
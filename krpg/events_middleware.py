@@ -23,7 +23,13 @@ class GameEvent(Event, HasGame):
 @attr.s(auto_attribs=True)
 class GameMiddleware(Middleware):
     game: Game
+    # isinstance against the protocol is slow, the answer is kept per event type
+    has_game: dict[type[Event], bool] = attr.ib(factory=lambda: {}, repr=False)
 
     def process(self, event: Event) -> None:
-        if isinstance(event, HasGame):
-            event.game = self.game
+        cls = type(event)
+        has_game = self.has_game.get(cls)
+        if has_game is None:
+            has_game = self.has_game[cls] = HasGame in cls.__mro__
+        if has_game:
+            event.game = self.game  # type: ignore[attr-defined]
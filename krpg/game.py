@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import code
 import logging
+import os
 import sys
 from itertools import groupby
 from typing import Any, Callable, Generator
@@ -16,20 +17,25 @@ from rich.text import Text
 from krpg.components import registry, Component
 from krpg.commands import CommandManager, command
 from krpg.encoder import create_save, load_save
-from krpg.engine.builder import build
+from krpg.engine.builder import load, load_pack
 from krpg.console import KrpgConsole
+from krpg.console.profiler import render_events, render_profile
 from krpg.data.consts import ABOUT, LOGO_GAME, __version__
 from krpg.actions import Action, ActionCategory, ActionManager, ActionState, action
 from krpg.engine.clock import Clock
 from krpg.engine.enums import GameState
+from krpg.engine.journal import Journal, JournalError, replay
 from krpg.engine.npc import NpcManager
 from krpg.engine.player import Player
+from krpg.engine.profiler import Profiler
 from krpg.engine.quests import QuestManager
 from krpg.engine.random import RandomManager
+from krpg.engine.reload import ContentWatcher
 from krpg.engine.world import World
-from krpg.bestiary import BESTIARY
-from krpg.engine.executer import Executer, NamedScript, run_scenario
+from krpg.bestiary import BESTIARY, Bestiary, use_bestiary
+from krpg.engine.executer import Executer, NamedScript, Suspension, resume_scenario, run_scenario
 from krpg.events import Event, EventHandler, listener
+from krpg.events_metrics import EventMetrics
 from krpg.events_middleware import GameEvent, GameMiddleware
 from krpg.saves import Savable
 
@@ -98,6 +104,73 @@ class RootActionManager(ActionManager):
         welcome = f"Python {v}, KRPG {__version__}"
         code.InteractiveConsole(locals={"game": game, "exit": ExitAlt()}).interact(welcome)
 
+    @action("reload", "Перезагрузить контент", ActionCategory.DEBUG)
+    @staticmethod
+    def action_reload(game: Game) -> None:
+        if not game._game.watcher:
+            game.console.print("Режим отладки отключен, команда не доступна")
+            return
+        game.reload_content(force=True)
+
+    @action("profile", "Профилирование сценариев", ActionCategory.DEBUG)
+    @staticmethod
+    def action_profile(game: Game) -> None:
+        if game.console.log.level != logging.DEBUG:
+            game.console.print("Режим отладки отключен, команда не доступна")
+            return
+        profiler = game.executer.profiler
+        if profiler is None:
+            game.executer.profiler = Profiler()
+            game.console.print("[green]Профилирование включено[/]")
+            return
+        game.console.print(render_profile(profiler))
+        options = {
+            "Сохранить в JSON": "json",
+            "Сохранить collapsed stack": "folded",
+            "Сбросить": "reset",
+            "Выключить": "off",
+        }
+        match game.console.select("Выберите действие: ", options, True):
+            case "json" | "folded" as ext:
+                path = f"profile.{ext}"
+                profiler.dump(path)
+                game.console.print(f"[green]Профиль сохранен в [yellow]{path}")
+            case "reset":
+                profiler.reset()
+            case "off":
+                game.executer.profiler = None
+                game.console.print("[green]Профилирование выключено[/]")
+
+    @action("events", "Метрики событий", ActionCategory.DEBUG)
+    @staticmethod
+    def action_events(game: Game) -> None:
+        if game.console.log.level != logging.DEBUG:
+            game.console.print("Режим отладки отключен, команда не доступна")
+            return
+        metrics = game.events.metrics
+        if metrics is None:
+            game.events.set_metrics(EventMetrics())
+            game.console.print("[green]Сбор метрик событий включен[/]")
+            return
+        if game.events.bus is not None:
+            game.events.bus.flush()
+        game.console.print(render_events(metrics))
+        options = {
+            "Сохранить в JSON": "json",
+            "Сбросить": "reset",
+            "Выключить": "off",
+        }
+        match game.console.select("Выберите действие: ", options, True):
+            case "json":
+                path = "events.json"
+                metrics.dump(path)
+                game.console.print(f"[green]Метрики сохранены в [yellow]{path}")
+            case "reset":
+                metrics.reset()
+            case "off":
+                game.events.set_metrics(None)
+                game.console.print("[green]Сбор метрик событий выключен[/]")
+
     @action("save", "Сохранить игру", ActionCategory.GAME)
     @staticmethod
     def action_save(game: Game) -> None:
@@ -107,12 +180,20 @@ class RootActionManager(ActionManager):
             game.console.console.print("Сохраненные данные:", save_data)
         save = create_save(save_data)
         game.console.print("[yellow]Сохраненные данные:[cyan]", save)
+        if game.commands.journal:
+            # Replay after a crash starts from the last snapshot
+            game.commands.journal.snapshot()
 
 
 class GameBase:
-    def __init__(self) -> None:
+    def __init__(self, bestiary: Bestiary | None = None, journal: str | None = None) -> None:
         self.state = GameState.MENU
         self.console = KrpgConsole()
+        # Sessions on the same content can share one bestiary
+        self.bestiary = bestiary or BESTIARY
+        self.watcher: ContentWatcher | None = None
+        # Path of the command journal the game is recovered from after a crash
+        self.journal = journal
 
     def show_logo(self) -> None:
         centered_logo = Align(LOGO_GAME, align="center")
@@ -126,11 +207,17 @@ class GameBase:
         )
 
     def load_bestiary(self, reset: bool = True):  # TODO: is reset really needed?
-        if not reset and not BESTIARY.data:
-            build(bestiary=BESTIARY, console=self.console)
-        else:
-            BESTIARY.data.clear()
-            build(bestiary=BESTIARY, console=self.console)
+        if self.console.log.level == logging.DEBUG:
+            # Content changes are picked up by a running game in debug mode,
+            # they are patched into a bestiary no other session uses
+            self.bestiary = Bestiary()
+            load(self.bestiary, self.console)
+            self.watcher = ContentWatcher(self.bestiary, self.console)
+            return
+        if reset or not self.bestiary.data:
+            # Other sessions may use the old bestiary, it is replaced and not cleared
+            self.bestiary = load_pack(self.console, reload=reset)
+        self.watcher = None
 
     def main(self) -> None:
         self.load_bestiary(False)
@@ -138,9 +225,12 @@ class GameBase:
         options: dict[str, Callable[..., Any]] = {
             "Начать новую игру": self.new_game,
             "Загрузить сохранение": self.load_game,
+            "Восстановить из журнала": self.recover_game,
             "Перезапустить сценарий": self.load_bestiary,
             "Выйти": exit,
         }
+        if not self.journal or not os.path.exists(self.journal):
+            del options["Восстановить из журнала"]
         self.show_logo()
         while True:
             choice = self.console.interactive_select("Добро пожаловать", options)
@@ -151,6 +241,9 @@ class GameBase:
     def new_game(self) -> None:
         self.state = GameState.INIT
         game_loop = Game(self)
+        if self.journal:
+            game_loop.commands.journal = Journal.create(game_loop, self.journal)
+            game_loop.commands.journal.start()
         self.state = GameState.PLAY
         self.handle_loop(game_loop)
 
@@ -173,9 +266,25 @@ class GameBase:
             self.console.print("[red]Ошибка: загрузка прервана[/]")
         else:
             game_loop = Game.deserialize(data, self)
+            if self.journal:
+                game_loop.commands.journal = Journal.create(game_loop, self.journal)
+                game_loop.commands.journal.snapshot()
             self.state = GameState.PLAY
             self.handle_loop(game_loop)
 
+    def recover_game(self) -> None:
+        assert self.journal
+        self.state = GameState.INIT
+        self.console.print("Восстановление игры из журнала...")
+        try:
+            game_loop = replay(self, self.journal)
+        except JournalError as e:
+            self.console.print(f"[red]Ошибка: журнал не воспроизводится: {e}[/]")
+            self.state = GameState.MENU
+            return
+        self.state = GameState.PLAY
+        self.handle_loop(game_loop)
+
     def handle_loop(self, loop: Game) -> None:
         # TODO: Add graceful exit
         try:
@@ -185,6 +294,10 @@ class GameBase:
             self.console.print("[red]История команд: ", self.console.history)
             self.console.print("[red]Ваше сохранение: ", create_save(loop.serialize()))
             self.state = GameState.MENU
+        finally:
+            loop.events.close()
+            if loop.commands.journal:
+                loop.commands.journal.close()
 
 
 class Game(Savable):
@@ -196,34 +309,41 @@ class Game(Savable):
         self.events.middlewares.append(GameMiddleware(self))
         self.commands = CommandManager(self.events)
 
-    def __init__(self, game: GameBase) -> None:
+    def __init__(self, game: GameBase, seed: int | None = None) -> None:
         self._game = game
         self._pre_init()
-        self.world = World()
-        self.npc_manager = NpcManager()
-        self.quest_manager = QuestManager()
-        self.executer = Executer(self)
-        self.player = Player()
-        self.clock = Clock()
-        self.random = RandomManager()
-        self._post_init()
-        init = BESTIARY.get_entity_by_id("init", NamedScript)
-        if init:
-            self.commands.execute(run_scenario(self.executer, init))
-        else:
-            self.console.log.debug("Init script not found")
+        with use_bestiary(self.bestiary):
+            self.world = World()
+            self.npc_manager = NpcManager()
+            self.quest_manager = QuestManager()
+            self.executer = Executer(self)
+            self.player = Player()
+            self.clock = Clock()
+            self.random = RandomManager()
+            if seed is not None:
+                self.random.set_seed(seed)
+            self._post_init()
+            init = self.bestiary.get_entity_by_id("init", NamedScript)
+            if init:
+                self.commands.execute(run_scenario(self.executer, init))
+            else:
+                self.console.log.debug("Init script not found")
 
     def serialize(self) -> dict[str, Any]:
         # TODO: Use component to find all root items
-        data: dict[str, Any] = {
-            "world": self.world.serialize(),
-            "npc_manager": self.npc_manager.serialize(),
-            "quest_manager": self.quest_manager.serialize(),
-            "executer": self.executer.serialize(),
-            "player": self.player.serialize(),
-            "clock": self.clock.serialize(),
-            "random": self.random.serialize(),
-        }
+        # Saved after the loop too, references are resolved in the session's bestiary
+        with use_bestiary(self.bestiary):
+            data: dict[str, Any] = {
+                "world": self.world.serialize(),
+                "npc_manager": self.npc_manager.serialize(),
+                "quest_manager": self.quest_manager.serialize(),
+                "executer": self.executer.serialize(),
+                "player": self.player.serialize(),
+                "clock": self.clock.serialize(),
+                "random": self.random.serialize(),
+            }
+            if self.executer.suspended:
+                data["script"] = self.executer.suspended.serialize()
         return data
 
     @classmethod
@@ -232,22 +352,28 @@ class Game(Savable):
         self._game = game
         self._pre_init()
 
-        self.world = World.deserialize(data.get("world", {}))
-        self.npc_manager = NpcManager.deserialize(data.get("npc_manager", {}))
-        self.quest_manager = QuestManager.deserialize(data.get("quest_manager", {}))
-        self.executer = Executer.deserialize(data.get("executer", {}), self)
-        self.player = Player.deserialize(data.get("player", {}))
-        self.clock = Clock.deserialize(data.get("clock", {}))
-        self.random = RandomManager.deserialize(data.get("random", {}))
-        self._post_init()
+        with use_bestiary(self.bestiary):
+            self.world = World.deserialize(data.get("world", {}))
+            self.npc_manager = NpcManager.deserialize(data.get("npc_manager", {}))
+            self.quest_manager = QuestManager.deserialize(data.get("quest_manager", {}))
+            self.executer = Executer.deserialize(data.get("executer", {}), self)
+            self.player = Player.deserialize(data.get("player", {}))
+            self.clock = Clock.deserialize(data.get("clock", {}))
+            self.random = RandomManager.deserialize(data.get("random", {}))
+            if script := data.get("script"):
+                self.executer.suspended = Suspension.deserialize(script)
+            self._post_init()
         return self
 
     def _post_init(self) -> None:
-        @listener(Event)
-        def debug_event(event: Event):
-            self.console.log.debug(f"Event: {event}")
+        # Formatting every event is slow, it is only logged in debug mode
+        if self.console.log.isEnabledFor(logging.DEBUG):
 
-        self.events.subscribe(debug_event)
+            @listener(Event, priority=-100)
+            def debug_event(event: Event):
+                self.console.log.debug(f"Event: {event}")
+
+            self.events.subscribe(debug_event)
         for component in registry.components:
             self.register(component)
 
@@ -262,6 +388,10 @@ class Game(Savable):
     def console(self) -> KrpgConsole:
         return self._game.console
 
+    @property
+    def bestiary(self) -> Bestiary:
+        return self._game.bestiary
+
     def register(self, component: Component) -> None:
         # TODO: rewrite to match?
         if isinstance(component, type):
@@ -270,20 +400,39 @@ class Game(Savable):
                 self.actions.submanagers.append(item)
                 self.console.log.debug(f"Added action manager {item}")
             else:
-                self.executer.extensions.append(item)
+                self.executer.add_extension(item)
                 self.console.log.debug(f"Added extension {item}")
         else:
             self.events.subscribe(component)
             self.console.log.debug(f"Added event subscribe {component}")
 
-    def play(self) -> None:
-        while True:
-            actions = self.actions.actions
-            actions += self.world.current_location.actions
+    def reload_content(self, force: bool = False) -> None:
+        watcher = self._game.watcher
+        if not watcher:
+            return
+        try:
+            names = watcher.poll(self, force)
+        except Exception as e:  # Content is edited live, keep the game running
+            self.console.print(f"[red]Ошибка перезагрузки контента: {e}")
+            return
+        if names:
+            self.console.print(f"[yellow]Контент обновлен: {', '.join(names)}")
 
-            self.execute_action(actions)
-            if self.state == GameState.MENU:
-                break
+    def play(self) -> None:
+        with use_bestiary(self.bestiary):
+            if self.executer.suspended:
+                # Saved while a script waited for input, it goes on from that prompt
+                self.commands.execute(resume_scenario(self.executer))
+                self.events.end_turn()
+            while True:
+                self.reload_content()
+                actions = self.actions.actions
+                actions += self.world.current_location.actions
+
+                self.execute_action(actions)
+                self.events.end_turn()
+                if self.state == GameState.MENU:
+                    break
 
     def execute_action(self, actions: list[Action], prompt: str = "> ", interactive: bool = False) -> Action | None:
         def _name(a: Action):
@@ -307,7 +456,7 @@ class Game(Savable):
         return None
 
 
-def main(debug: bool) -> None:
-    game = GameBase()
+def main(debug: bool, journal: str | None = None) -> None:
+    game = GameBase(journal=journal)
     game.console.set_debug(debug)
     game.main()
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import re
+import sys
 from enum import Enum, auto
+from typing import Iterable, Iterator, NamedTuple, Sequence
 
 import attr
 
@@ -11,10 +14,43 @@ class TokenType(Enum):
     COMMAND = auto()
 
 
+class Token(NamedTuple):
+    type: TokenType
+    value: str
+    line: int
+    column: int
+
+
+class Node(NamedTuple):
+    """Frozen parse tree node used at runtime
+
+    Commands have children set to None. Nodes do not point to their parent,
+    so the parse tree they were made from can be garbage-collected.
+    """
+
+    name: str | None
+    args: tuple[str, ...] = ()
+    children: tuple[Node, ...] | None = None
+    source: str = "<string>"
+    line: int = 0
+    column: int = 0
+
+    @property
+    def position(self) -> str:
+        return f"{self.source}:{self.line}:{self.column}"
+
+
 @attr.s(auto_attribs=True)
 class Command:
     content: list[str] = attr.field(factory=lambda: [])
     parrent: Section = attr.field(default=None, repr=False)
+    source: str = attr.field(default="<string>", repr=False)
+    line: int = attr.field(default=0, repr=False)
+    column: int = attr.field(default=0, repr=False)
+
+    @property
+    def position(self) -> str:
+        return f"{self.source}:{self.line}:{self.column}"
 
     @property
     def name(self) -> str | None:
@@ -30,6 +66,17 @@ class Section:
     content: list[str] = attr.field(factory=lambda: [])
     parrent: Section = attr.field(default=None, repr=False)
     children: list[Section | Command] = attr.field(factory=lambda: [])
+    source: str = attr.field(default="<string>", repr=False)
+    line: int = attr.field(default=0, repr=False)
+    column: int = attr.field(default=0, repr=False)
+    # name -> children multimap and section-only views, kept in sync by add_children
+    _names: dict[str | None, list[Section | Command]] = attr.field(factory=lambda: {}, init=False, repr=False, eq=False)
+    _sections: list[Section] = attr.field(factory=lambda: [], init=False, repr=False, eq=False)
+    _section_names: dict[str | None, list[Section]] = attr.field(factory=lambda: {}, init=False, repr=False, eq=False)
+
+    @property
+    def position(self) -> str:
+        return f"{self.source}:{self.line}:{self.column}"
 
     @property
     def name(self) -> str | None:
@@ -39,105 +86,141 @@ class Section:
     def args(self) -> list[str]:
         return self.content[1:]
 
+    def __attrs_post_init__(self) -> None:
+        for child in self.children:
+            self._index(child)
+
+    def _index(self, item: Section | Command) -> None:
+        self._names.setdefault(item.name, []).append(item)
+        if isinstance(item, Section):
+            self._sections.append(item)
+            self._section_names.setdefault(item.name, []).append(item)
+
     def add_children(self, item: Section | Command) -> None:
         item.parrent = self
         self.children.append(item)
+        self._index(item)
 
     def get(self, name: str, command: bool = True, section: bool = True) -> Section | Command | None:
-        for child in self.children:
-            if child.name == name:
-                if command or (section and isinstance(child, Section)):
-                    return child
-        return None
+        found: Sequence[Section | Command] | None
+        if command:
+            found = self._names.get(name)
+        elif section:
+            found = self._section_names.get(name)
+        else:
+            found = None
+        return found[0] if found else None
 
     def all(self, name: str = "", command: bool = True, section: bool = True) -> list[Section | Command]:
-        result: list[Section | Command] = []
-        for child in self.children:
-            if not name or child.name == name:
-                if command or (section and isinstance(child, Section)):
-                    result.append(child)
-        return result
+        found: Sequence[Section | Command]
+        if command:
+            found = self._names.get(name, []) if name else self.children
+        elif section:
+            found = self._section_names.get(name, []) if name else self._sections
+        else:
+            found = []
+        return list(found)
 
     def has(self, name: str, command: bool = True, section: bool = True) -> bool:
-        for child in self.children:
-            if child.name == name:
-                if command or (section and isinstance(child, Section)):
-                    return True
-        return False
-
-
-def tokenize(text: str) -> list[tuple[TokenType, str]]:
-    text = text.strip()
-    tokens: list[tuple[TokenType, str]] = []
-    temp = ""
-    is_string = False
-    is_comment = False
-    close_char = None
-
-    def add_temp(t: TokenType = TokenType.COMMAND) -> None:
-        nonlocal temp
-        if temp or is_string:
-            tokens.append((t, temp.strip()))
-            temp = ""
-
-    for char in text:
-        if is_string:
-            if char == close_char:
-                add_temp()
-                is_string = False
-            else:
-                temp += char
-            continue
-        if is_comment:
-            if char == "\n":
-                is_comment = False
-            else:
-                continue
-        if char in "{}":
-            add_temp()
-            tokens.append((TokenType.BRACE, char))
-        elif char in "\"'`":
-            is_string = True
-            close_char = char
-        elif char == "#":
-            is_comment = True
-        elif char == "\n":
-            add_temp()
-            tokens.append((TokenType.NEWLINE, "\n"))
-        elif char != " ":
-            temp += char
+        return self.get(name, command, section) is not None
+
+
+# Leading spaces and comments are consumed together with the next token,
+# groups: 1 - word, 2..4 - string glued to the word, 5 - newline, 6 - brace,
+# 7..9 - strings, 10 - end of text
+_SCANNER = re.compile(
+    r"""
+    [^\S\n]*(?:\#[^\n]*)?
+    (?:
+        ([^\s{}"'`\#]+)(?:"([^"]*)"|'([^']*)'|`([^`]*)`)?
+        |(\n)
+        |([{}])
+        |"([^"]*)"|'([^']*)'|`([^`]*)`
+        |(\Z)
+    )
+    """,
+    re.VERBOSE,
+)
+
+_new_token = tuple.__new__
+
+
+def tokenize(text: str) -> Iterator[Token]:
+    line, line_start, pos = 1, 0, 0
+    command, newline, brace = TokenType.COMMAND, TokenType.NEWLINE, TokenType.BRACE
+    for match in _SCANNER.finditer(text):
+        if match.start() != pos:
+            rest = text[pos : match.start()]
+            column = pos + len(rest) - len(rest.lstrip()) - line_start + 1
+            raise ValueError(f"Unterminated string at {line}:{column}")
+        group = match.lastindex
+        assert group is not None, "Every alternative of the scanner is a group"
+        pos = match.end()
+        if group == 1:
+            yield _new_token(Token, (command, match.group(1), line, match.start(1) - line_start + 1))
+        elif group == 5:
+            yield _new_token(Token, (newline, "\n", line, match.start(5) - line_start + 1))
+            line, line_start = line + 1, pos
+        elif group == 6:
+            yield _new_token(Token, (brace, match.group(6), line, match.start(6) - line_start + 1))
+        elif group == 10:
+            break
         else:
-            add_temp()
-    add_temp()
-    tokens.append((TokenType.NEWLINE, "\n"))
-    return tokens
+            start = match.start(group)
+            value = match.group(group)
+            if group <= 4:
+                # A string right after a word continues it, as in `key="a b"`
+                yield _new_token(Token, (command, (match.group(1) + value).strip(), line, match.start(1) - line_start + 1))
+            else:
+                yield _new_token(Token, (command, value.strip(), line, start - line_start))
+            if breaks := value.count("\n"):
+                line, line_start = line + breaks, text.rindex("\n", start, pos) + 1
+    else:
+        # finditer stops silently on the first character it can not match
+        raise ValueError(f"Unterminated string at {line}:{pos - line_start + 1}")
+    yield _new_token(Token, (newline, "\n", line, len(text) - line_start + 1))
 
 
-def parse(tokens: list[tuple[TokenType, str]]) -> Section:
-    result = Section()
+def parse(tokens: Iterable[Token], source: str = "<string>") -> Section:
+    result = Section(source=source)
     current: list[str] = []
+    first: Token | None = None
     select = result
 
-    for type, token in tokens:
+    for token in tokens:
+        type = token.type
         if type == TokenType.BRACE:
-            if token == "{":
-                new = Section(current)
-                current = []
+            if token.value == "{":
+                first = first or token
+                new = Section(current, source=source, line=first.line, column=first.column)
+                current, first = [], None
                 select.add_children(new)
                 select = new
             else:
                 if current:
-                    select.add_children(Command(current))
-                    current = []
+                    assert first
+                    select.add_children(Command(current, source=source, line=first.line, column=first.column))
+                    current, first = [], None
+                if select.parrent is None:
+                    raise ValueError(f"Unexpected }} at {source}:{token.line}:{token.column}")
                 select = select.parrent
         elif type == TokenType.COMMAND:
-            current.append(token)
+            first = first or token
+            current.append(token.value)
         elif type == TokenType.NEWLINE and current:
-            select.add_children(Command(current))
-            current = []
+            assert first
+            select.add_children(Command(current, source=source, line=first.line, column=first.column))
+            current, first = [], None
     return result
 
 
+def freeze(item: Section | Command) -> Node:
+    content = tuple(sys.intern(i) for i in item.content)
+    name, args = (content[0], content[1:]) if content else (None, ())
+    children = tuple(freeze(child) for child in item.children) if isinstance(item, Section) else None
+    return Node(name, args, children, sys.intern(item.source), item.line, item.column)
+
+
 if __name__ == "__main__":
     # Пример использования
     text = """
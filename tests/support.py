@@ -0,0 +1,13 @@
+import io
+
+from krpg.bestiary import Bestiary
+from krpg.game import GameBase
+
+
+def game_base(bestiary: Bestiary | None = None, journal: str | None = None, load: bool = True) -> GameBase:
+    """Game base with the console output hidden, on the bundled content unless a bestiary is given"""
+    base = GameBase(bestiary, journal)
+    base.console.console.file = io.StringIO()
+    if load and bestiary is None:
+        base.load_bestiary(False)
+    return base
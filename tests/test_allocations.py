@@ -0,0 +1,27 @@
+import unittest
+
+from bench import nested_scenario, parse_allocations
+from krpg.engine.executer import generate_named_script
+from krpg.engine.linker import Linker
+from krpg.game import Game
+from krpg.parser import Section, parse, tokenize
+from tests.support import game_base
+
+
+class CompiledScriptAllocationTest(unittest.TestCase):
+    def test_runs_allocate_no_parse_objects(self) -> None:
+        game = Game(game_base())
+        self.addCleanup(game.events.close)
+        section = parse(tokenize(nested_scenario(5))).children[0]
+        assert isinstance(section, Section)
+        script = generate_named_script(section)
+        Linker(game.bestiary).link_script(script)
+        # The first run compiles the scenario
+        script.script.run(game.executer)
+
+        parse_objects, _ = parse_allocations(lambda: script.script.run(game.executer), 50)
+        self.assertEqual(parse_objects, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
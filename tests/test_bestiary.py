@@ -0,0 +1,41 @@
+import glob
+import os
+import tempfile
+import unittest
+
+from krpg import ROOT_DIR
+from krpg.bestiary import Bestiary
+from krpg.engine.builder import load
+from krpg.game import GameBase
+
+
+class SharedBestiaryTest(unittest.TestCase):
+    def test_reload_keeps_other_sessions(self) -> None:
+        first, second = GameBase(), GameBase()
+        first.load_bestiary(False)
+        second.load_bestiary(False)
+        self.assertIs(first.bestiary, second.bestiary)
+
+        shared = first.bestiary
+        entities = list(shared.data)
+        second.load_bestiary()
+        self.assertIsNot(second.bestiary, shared)
+        self.assertEqual(shared.data, entities)
+        self.assertEqual(len(second.bestiary.data), len(entities))
+
+
+class ContentCacheTest(unittest.TestCase):
+    def test_cache_outside_package(self) -> None:
+        console = GameBase().console
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "content.krpgc")
+            built, cached = Bestiary(), Bestiary()
+            load(built, console, cache=path)
+            self.assertTrue(os.path.exists(path))
+            load(cached, console, cache=path)
+        self.assertEqual([entity.id for entity in cached.data], [entity.id for entity in built.data])
+        self.assertEqual(glob.glob(f"{ROOT_DIR}/**/*.krpgc", recursive=True), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import asyncio
+import unittest
+
+from krpg.events import Delivery, Event, EventHandler, listener
+from krpg.events_bus import EventBus
+from krpg.events_metrics import EventMetrics
+from krpg.game import Game
+from tests.support import game_base
+
+
+class BackgroundMetricsTest(unittest.TestCase):
+    def test_coroutine_listener_timed_until_done(self) -> None:
+        handler = EventHandler()
+        handler.bus = EventBus()
+        self.addCleanup(handler.close)
+        metrics = EventMetrics()
+        handler.set_metrics(metrics)
+
+        async def slow(event: Event) -> None:
+            await asyncio.sleep(0.05)
+
+        handler.subscribe(listener(Event, delivery=Delivery.BACKGROUND)(slow))
+        handler.publish(Event())
+        handler.bus.flush(5)
+
+        (name, histogram), *_ = metrics.listeners.items()
+        self.assertTrue(name.endswith("slow"))
+        self.assertEqual(histogram.count, 1)
+        self.assertGreaterEqual(histogram.max, 50_000_000)
+
+
+class LazyBusTest(unittest.TestCase):
+    def test_bus_created_for_first_queued_listener(self) -> None:
+        handler = EventHandler()
+        self.addCleanup(handler.close)
+        handler.subscribe(listener(Event)(lambda event: None))
+        self.assertIsNone(handler.bus)
+
+        handler.subscribe(listener(Event, delivery=Delivery.DEFERRED)(lambda event: None))
+        self.assertIsNotNone(handler.bus)
+        assert handler.bus
+        # The loop thread is only started by a background listener
+        self.assertIsNone(handler.bus.thread)
+
+    def test_game_without_debug_has_no_bus(self) -> None:
+        game = Game(game_base())
+        self.addCleanup(game.events.close)
+        self.assertIsNone(game.events.bus)
+
+
+if __name__ == "__main__":
+    unittest.main()
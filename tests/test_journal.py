@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+from typing import Sequence
+
+from krpg.bestiary import BESTIARY, Bestiary
+from krpg.engine.builder import load
+from krpg.engine.clock import wait
+from krpg.engine.enums import GameState
+from krpg.encoder import create_save, load_save
+from krpg.engine.journal import Journal, read_records, replay
+from krpg.engine.random import RandomManager
+from krpg.game import Game, GameBase
+from tests.support import game_base
+
+COMMANDS = "pickup 1 pickup 1 go 1 go 2 talk 1 1 go 2 talk 1 1 1 2 4 go 1 go 1 go 3 talk 1 1 explore explore go 1 sleep quests".split()
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self) -> None:
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, "game.journal")
+        # The session bestiary is not the global one, replay has to resolve entities in it
+        self.bestiary = Bestiary()
+        load(self.bestiary, game_base(load=False).console)
+        self.assertFalse(BESTIARY.data)
+
+    def base(self) -> GameBase:
+        base = game_base(self.bestiary, self.path)
+        base.state = GameState.PLAY
+        return base
+
+    def play(self, commands: Sequence[str]) -> Game:
+        base = self.base()
+        game = Game(base, seed=7)
+        game.commands.journal = Journal.create(game, self.path)
+        game.commands.journal.start()
+        base.console.queue.extend(commands)
+        try:
+            game.play()
+        except (EOFError, KeyboardInterrupt, OSError):
+            pass
+        finally:
+            game.events.close()
+            game.commands.journal.close()
+        return game
+
+    def replay(self) -> Game:
+        game = replay(self.base(), self.path)
+        game.events.close()
+        assert game.commands.journal
+        game.commands.journal.close()
+        return game
+
+    def test_replay_from_start(self) -> None:
+        game = self.play(COMMANDS)
+        self.assertEqual(self.replay().serialize(), game.serialize())
+
+    def test_replay_from_snapshot(self) -> None:
+        game = self.play(COMMANDS[:4] + ["save"] + COMMANDS[4:])
+        self.assertEqual(self.replay().serialize(), game.serialize())
+
+    def test_replay_from_delta(self) -> None:
+        game = Game(self.base(), seed=7)
+        journal = game.commands.journal = Journal.create(game, self.path)
+        journal.start()
+        env = game.executer.env
+        env["kept"], env["changed"], env["deleted"] = 1, 1, 1
+        journal.snapshot()
+        env["changed"], env["added"] = 2, 2
+        del env["deleted"]
+        journal.snapshot()
+        game.commands.execute(wait(game.clock, 1))
+        game.events.close()
+        journal.close()
+
+        with open(self.path, "rb") as file:
+            records = list(read_records(file))
+        self.assertEqual([record[0] for record in records], ["start", "snapshot", "delta", "command"])
+        self.assertEqual(records[2][1]["executer"], {"set": {"changed": 2, "added": 2}, "deleted": ["deleted"]})
+        replayed = self.replay()
+        self.assertEqual(replayed.executer.env, {"kept": 1, "changed": 2, "added": 2})
+        self.assertEqual(replayed.serialize(), game.serialize())
+
+    def test_new_journal_keeps_old(self) -> None:
+        game = self.play(COMMANDS)
+        self.play(COMMANDS[:2])
+        backups = [name for name in os.listdir(os.path.dirname(self.path)) if name != "game.journal"]
+        self.assertEqual(len(backups), 1)
+        self.path = os.path.join(os.path.dirname(self.path), backups[0])
+        self.assertEqual(self.replay().serialize(), game.serialize())
+
+    def test_random_restored_from_state(self) -> None:
+        game = Game(self.base(), seed=7)
+        self.addCleanup(game.events.close)
+        game.random.choices(list(range(10)), k=50)
+        # Saves turn the generator state tuples into lists
+        restored = RandomManager.deserialize(load_save(create_save(game.random.serialize())))
+        self.assertEqual(restored.state, 50)
+        self.assertEqual([restored.random() for _ in range(5)], [game.random.random() for _ in range(5)])
+
+    def test_torn_tail(self) -> None:
+        game = self.play(COMMANDS)
+        with open(self.path, "ab") as file:
+            file.write(b"\x00\x00\x01\x00abc")
+        self.assertEqual(self.replay().serialize(), game.serialize())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+
+from krpg.parser import tokenize
+
+
+class TokenizeTest(unittest.TestCase):
+    def values(self, text: str) -> list[str]:
+        return [token.value for token in tokenize(text)]
+
+    def test_string_glued_to_word(self) -> None:
+        # Same as the character tokenizer: the string continues the word before it
+        self.assertEqual(self.values('abc"def"'), ["abcdef", "\n"])
+        self.assertEqual(self.values('key="a b " c'), ["key=a b", "c", "\n"])
+        self.assertEqual(self.values('"a"b'), ["a", "b", "\n"])
+
+    def test_glued_string_lines(self) -> None:
+        tokens = list(tokenize('a"x\ny" b'))
+        self.assertEqual([(token.value, token.line, token.column) for token in tokens], [("ax\ny", 1, 1), ("b", 2, 4), ("\n", 2, 5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from typing import Any, Generator
+
+from krpg.commands import Command, command
+from krpg.engine.clock import wait
+from krpg.engine.executer import Condition
+from krpg.engine.quests import Objective, Quest, QuestPredicate, Reward, Stage
+from krpg.events import Event
+from krpg.game import Game
+from tests.support import game_base
+
+
+class Always(Objective):
+    def check(self, event: Event, state: Any, completed: bool) -> bool:
+        return True
+
+
+@command
+def probe(game: Game, condition: Condition, results: list[bool]) -> Generator[Event, Any, None]:
+    results.append(game.executer.check(condition))
+    yield from ()
+
+
+class Probe(Reward):
+    def __init__(self, condition: Condition) -> None:
+        self.condition = condition
+        self.results: list[bool] = []
+
+    def run(self, game: Game) -> Command[...]:
+        return probe(game, self.condition, self.results)
+
+
+class QuestPredicateTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.game = Game(game_base())
+        self.addCleanup(self.game.events.close)
+
+    def test_unlinked_quest_id(self) -> None:
+        quest = self.game.bestiary.strict_get_entity_by_id("main", Quest)
+        self.assertTrue(QuestPredicate.eval(self.game, quest, "started"))
+        self.assertTrue(QuestPredicate.eval(self.game, "main", "started"))
+        with self.assertRaises(ValueError):
+            QuestPredicate.eval(self.game, "no_such_quest", "started")
+
+    def test_reward_sees_completed_quest(self) -> None:
+        quest = Quest(id="probe", name="Проверка")
+        condition = Condition("quest", (quest, "started"))
+        reward = Probe(condition)
+        quest.stages.append(Stage("Этап", [Always("Всегда")], [reward]))
+        self.game.quest_manager.start(quest)
+        # Memoized while the quest is running
+        self.assertTrue(self.game.executer.check(condition))
+
+        self.game.commands.execute(wait(self.game.clock, 1))
+        self.assertEqual(reward.results, [False])
+        self.assertFalse(self.game.executer.check(condition))
+
+
+if __name__ == "__main__":
+    unittest.main()
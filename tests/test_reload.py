@@ -0,0 +1,66 @@
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from krpg import ROOT_DIR
+from krpg.bestiary import Bestiary, use_bestiary
+from krpg.engine.builder import BASE_FOLDER, load, load_pack
+from krpg.engine.quests import Quest
+from krpg.engine.reload import ContentWatcher
+from krpg.game import Game
+from tests.support import game_base
+
+EXTRA = """    extra "Поручение" "Проверка перезагрузки" {
+        "Этап" {
+            goal VISIT main_square "Добраться до главной площади"
+        }
+    }
+"""
+
+
+class ReloadTest(unittest.TestCase):
+    def setUp(self) -> None:
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = os.path.join(folder.name, "content")
+        shutil.copytree(os.path.join(ROOT_DIR, BASE_FOLDER), self.folder)
+        self.main = os.path.join(self.folder, "main.krpg")
+        with open(self.main, encoding="utf-8") as file:
+            self.source = file.read()
+        self.write(self.source.replace("\nquests {\n", "\nquests {\n" + EXTRA, 1))
+        self.cache = os.path.join(folder.name, "content.krpgc")
+
+    def write(self, text: str) -> None:
+        with open(self.main, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def test_removed_entities(self) -> None:
+        base = game_base(Bestiary())
+        load(base.bestiary, base.console, self.folder, self.cache)
+        watcher = ContentWatcher(base.bestiary, base.console, self.folder)
+        game = Game(base)
+        self.addCleanup(game.events.close)
+        extra = base.bestiary.strict_get_entity_by_id("extra", Quest)
+        game.quest_manager.start(extra)
+
+        self.write(self.source)
+        with use_bestiary(game.bestiary):
+            self.assertEqual(watcher.poll(game, force=True), ["quests"])
+        self.assertIsNone(base.bestiary.get_entity_by_id("extra", Quest))
+        self.assertEqual(base.bestiary.get_all(Quest), [q for q in base.bestiary.data if isinstance(q, Quest)])
+        self.assertNotIn("extra", [state.quest.id for state in game.quest_manager.quests])
+
+    def test_debug_session_bestiary_is_private(self) -> None:
+        base = game_base(load=False)
+        base.console.set_debug(True)
+        self.addCleanup(base.console.set_debug, False)
+        base.load_bestiary(False)
+        self.assertEqual(base.console.log.level, logging.DEBUG)
+        self.assertIsNotNone(base.watcher)
+        self.assertIsNot(base.bestiary, load_pack(base.console))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+from typing import Sequence
+
+from krpg.encoder import create_save, load_save
+from krpg.engine.clock import TimepassEvent
+from krpg.engine.enums import GameState
+from krpg.engine.executer import NamedScript, generate_named_script
+from krpg.engine.linker import LinkError, Linker
+from krpg.engine.profiler import Profiler
+from krpg.events import listener
+from krpg.game import Game
+from krpg.parser import Section, parse, tokenize
+from tests.support import game_base
+
+# Therin's dialogue ends with a choice of quests
+BEFORE_CHOICE = "pickup 1 pickup 1 pickup 1 pickup 1 inventory 11 w 13 w 14 w e go 1 go 2 talk 1 1 go 2 talk 1 1".split()
+CHOICE = "1 3 4".split()
+
+BATCH = """batch_choice {
+batch {
+    multiple "Выбор" 1 1 choice {
+        option 1 "Один"
+        option 2 "Два"
+    }
+    pass 1
+    pass 2
+}
+}
+"""
+
+
+class SuspendedScriptTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.base = game_base()
+        self.base.state = GameState.PLAY
+
+    def play(self, game: Game, commands: Sequence[str]) -> None:
+        self.base.console.queue.extend(commands)
+        try:
+            game.play()
+        except (EOFError, KeyboardInterrupt, OSError):
+            pass
+        finally:
+            game.events.close()
+
+    def quests(self, game: Game) -> list[str]:
+        return [state.quest.id for state in game.quest_manager.quests]
+
+    def test_resume_after_load(self) -> None:
+        game = self.play_to_choice()
+        data = load_save(create_save(game.serialize()))
+        self.assertIn("script", data)
+
+        loaded = Game.deserialize(data, self.base)
+        self.play(loaded, CHOICE)
+        self.assertIsNone(loaded.executer.suspended)
+        self.assertIn("find_berries", self.quests(loaded))
+        self.assertEqual(self.quests(loaded), self.quests(self.play_through()))
+
+    def play_to_choice(self) -> Game:
+        game = Game(self.base, seed=1)
+        self.play(game, BEFORE_CHOICE)
+        assert game.executer.suspended is not None
+        self.assertEqual(game.executer.suspended.request.max, 2)
+        return game
+
+    def play_through(self) -> Game:
+        game = Game(self.base, seed=1)
+        self.play(game, BEFORE_CHOICE + CHOICE)
+        self.assertIsNone(game.executer.suspended)
+        return game
+
+    def test_resume_in_batch(self) -> None:
+        game = Game(self.base, seed=1)
+        self.addCleanup(game.events.close)
+        section = parse(tokenize(BATCH)).children[0]
+        assert isinstance(section, Section)
+        script = generate_named_script(section)
+        Linker(self.base.bestiary).link_script(script)
+        published: list[list[TimepassEvent]] = []
+        game.events.subscribe(listener(TimepassEvent, batch=True)(published.append))
+
+        self.assertIsNotNone(game.executer.start(script))
+        self.assertIsNone(game.executer.resume([2]))
+        # Events after the answer are still published together when the block ends
+        self.assertEqual(published, [[TimepassEvent(3)]])
+        self.assertEqual(game.executer.env["choice"], [2])
+
+    def test_profiled_and_plain_blocks_cached(self) -> None:
+        game = Game(self.base, seed=1)
+        self.addCleanup(game.events.close)
+        script = self.base.bestiary.strict_get_entity_by_id("first_trip", NamedScript).script
+        commands, profiler = game.executer.commands, Profiler()
+        plain, profiled = script.compile(commands), script.compile(commands, profiler)
+        # Sessions with and without a profiler share the script, neither recompiles it
+        self.assertIsNot(plain, profiled)
+        self.assertIs(script.compile(commands), plain)
+        self.assertIs(script.compile(commands, profiler), profiled)
+
+
+class TimeLinkTest(unittest.TestCase):
+    def link(self, body: str) -> Linker:
+        section = parse(tokenize(f"script {{\n{body}\n}}\n")).children[0]
+        assert isinstance(section, Section)
+        linker = Linker(game_base().bestiary)
+        linker.link_script(generate_named_script(section))
+        return linker
+
+    def test_negative_minutes_rejected(self) -> None:
+        for body in ("pass -5", "wait -5"):
+            with self.subTest(body=body), self.assertRaises(LinkError):
+                self.link(body).raise_errors()
+        self.link("pass 5\nwait 5").raise_errors()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from krpg.engine.texts import StaticText, TemplateText, compile_text
+from krpg.game import Game
+from tests.support import game_base
+
+
+class TextTest(unittest.TestCase):
+    game: Game
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.game = Game(game_base())
+        cls.game.events.close()
+
+    def render(self, text: str) -> str:
+        compiled = compile_text(text)
+        result = str(compiled.render(self.game, self.game.executer.env))
+        # Texts render the same as the f-string evaluated by the executer
+        self.assertEqual(result, self.game.executer.process_text(text))
+        return result
+
+    def test_static(self) -> None:
+        self.assertIsInstance(compile_text("Привет, [green]мир[/] {{x}}"), StaticText)
+        self.assertEqual(self.render("Привет {{x}}"), "Привет {x}")
+
+    def test_compiled_template(self) -> None:
+        self.game.executer.env["count"] = 3
+        text = compile_text("Осталось {count + 1}")
+        assert isinstance(text, TemplateText)
+        self.assertIsNotNone(text.expression)
+        self.assertEqual(self.render("Осталось {count + 1}"), "Осталось 4")
+
+    def test_attribute_chain(self) -> None:
+        name = self.game.player.entity.name
+        self.assertEqual(self.render("Hi {game.player.entity.name}"), f"Hi {name}")
+
+    def test_method_call(self) -> None:
+        self.game.executer.env["quest_selects"] = ["a", "b"]
+        self.assertEqual(self.render('{", ".join(quest_selects)}'), "a, b")
+        self.assertEqual(self.render("{game.clock.minutes.__str__()}"), str(self.game.clock.minutes))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,7 @@ Tools for development. Run with `python tools.py --help`.
 
 import argparse
 import json
+
 import updater
 
 
@@ -27,6 +28,83 @@ def build_hashes(build_args: argparse.Namespace):
             json.dump(hashes, f, indent=4)
 
 
+def flatten(data: dict, prefix: str = "") -> dict[str, object]:
+    """Flatten nested dict into dotted keys
+
+    Parameters
+    ----------
+    data : dict
+        Nested dict
+    prefix : str, optional
+        Key prefix, by default ""
+
+    Returns
+    -------
+    dict[str, object]
+        Flat dict
+    """
+    flat: dict[str, object] = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def run_bench(bench_args: argparse.Namespace):
+    """Run benchmark suite
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Arguments
+    """
+    import bench
+    from krpg.data.consts import __version__
+
+    if bench_args.suite not in bench.SUITES:
+        parser.error(f"unknown suite {bench_args.suite!r}, choose from {', '.join(bench.SUITES)}")
+    results = bench.SUITES[bench_args.suite](bench_args.sizes or bench.DEFAULT_SIZES)
+    for key, value in flatten(results).items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+    if bench_args.json:
+        print(f"Writing to {bench_args.json}")
+        with open(bench_args.json, "w", encoding="utf-8") as f:
+            json.dump({"suite": bench_args.suite, "version": __version__, "results": results}, f, indent=4)
+
+
+def compile_content(compile_args: argparse.Namespace):
+    """Build content and write compiled cache
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Arguments
+    """
+    from krpg.bestiary import Bestiary
+    from krpg.console import KrpgConsole
+    from krpg.engine import builder
+
+    bestiary = Bestiary()
+    path = builder.compile_content(bestiary, KrpgConsole())
+    print(f"Compiled {len(bestiary.data)} entities to {path}")
+
+
+def generate_content(generate_args: argparse.Namespace):
+    """Write generated content pack
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Arguments
+    """
+    import generator
+
+    paths = generator.write_world(generate_args.folder, generate_args.entities, generate_args.seed)
+    print(f"Generated {generate_args.entities} entities in {len(paths)} files")
+
+
 parser = argparse.ArgumentParser()
 parser.add_argument("--version", "-v", action="version", version="%(prog)s 1.0")
 subparsers = parser.add_subparsers(dest="command", help="Action to perform", required=True)
@@ -40,6 +118,19 @@ build_sub.add_argument(
 )
 build_sub.add_argument("--output", "-o", action="store_true", help="Output to console")
 build_sub.set_defaults(func=build_hashes)
+compile_sub = subparsers.add_parser("compile", help="Build content cache")
+compile_sub.set_defaults(func=compile_content)
+generate_sub = subparsers.add_parser("generate", help="Generate synthetic content pack")
+generate_sub.add_argument("folder", action="store", help="Folder to write pack to")
+generate_sub.add_argument("--entities", "-n", type=int, default=1000, help="Number of entities")
+generate_sub.add_argument("--seed", type=int, default=0, help="Random seed")
+generate_sub.set_defaults(func=generate_content)
+bench_sub = subparsers.add_parser("bench", help="Run benchmark suite")
+# Suites are checked when the bench runs, other commands do not import it
+bench_sub.add_argument("suite", action="store", help="Suite to run")
+bench_sub.add_argument("--sizes", "-s", type=int, nargs="+", help="Content sizes to measure")
+bench_sub.add_argument("--json", "-j", action="store", help="Write results to JSON file")
+bench_sub.set_defaults(func=run_bench)
 if __name__ == "__main__":
     args = parser.parse_args()
     args.func(args)